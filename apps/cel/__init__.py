@@ -23,6 +23,41 @@ app.conf.beat_schedule = {
         "schedule": crontab(minute="*/5"),
         "args": (),
     },
+    "reap_reservations": {
+        "task": "apps.vcd.tasks.reap_reservations",
+        "schedule": crontab(minute="*"),
+        "args": (),
+    },
+    "reconcile_stock": {
+        "task": "apps.vcd.tasks.reconcile_stock",
+        "schedule": crontab(minute="*/5"),
+        "args": (),
+    },
+    "draw_lotteries": {
+        "task": "apps.vcd.tasks.draw_lotteries",
+        "schedule": crontab(minute="*"),
+        "args": (),
+    },
+    "schedule_prewarm": {
+        "task": "apps.vcd.tasks.schedule_prewarm",
+        "schedule": crontab(minute="*"),
+        "args": (),
+    },
+    "schedule_stock_pushes": {
+        "task": "apps.vcd.tasks.schedule_stock_pushes",
+        "schedule": crontab(minute="*"),
+        "args": (),
+    },
+    "archive_receive_histories": {
+        "task": "apps.vcd.tasks.archive_receive_histories",
+        "schedule": crontab(minute="0", hour="4"),
+        "args": (),
+    },
+    "archive_tcaptcha_histories": {
+        "task": "apps.tcaptcha.tasks.archive_histories",
+        "schedule": crontab(minute="30", hour="4"),
+        "args": (),
+    },
     "sync_blacklist": {
         "task": "apps.tcaptcha.tasks.sync_blacklist",
         "schedule": crontab(minute="*/5"),
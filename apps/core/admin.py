@@ -0,0 +1,19 @@
+from django.template.response import TemplateResponse
+
+from apps.core.routers import use_replica
+
+
+class ReplicaAdminMixin:
+    """
+    Serve changelist pages and searches from the replica
+    """
+
+    def changelist_view(self, request, extra_context=None):
+        if request.method != "GET":
+            return super().changelist_view(request, extra_context)
+        with use_replica():
+            response = super().changelist_view(request, extra_context)
+            # render inside, the template evaluates the lazy querysets
+            if isinstance(response, TemplateResponse):
+                response.render()
+            return response
@@ -0,0 +1,78 @@
+import gzip
+import json
+import os
+from typing import Callable, Dict, List
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, transaction
+from django.utils import timezone
+
+# files present inside docker and podman containers
+CONTAINER_MARKERS = ("/.dockerenv", "/run/.containerenv")
+
+
+def get_mount_point(path: str) -> str:
+    path = os.path.realpath(path)
+    while not os.path.ismount(path):
+        path = os.path.dirname(path)
+    return path
+
+
+def check_archive_root() -> None:
+    """
+    refuse to archive into a directory that does not outlive the container, rows are deleted once written
+    """
+
+    if not settings.ARCHIVE_ROOT:
+        raise ImproperlyConfigured("ARCHIVE_ROOT is required to archive histories")
+    # a volume that is not mounted leaves no directory, creating one would write into the container
+    if not os.path.isdir(settings.ARCHIVE_ROOT):
+        raise ImproperlyConfigured(f"ARCHIVE_ROOT {settings.ARCHIVE_ROOT} does not exist")
+    # the root filesystem of a container is gone once it is recreated
+    in_container = any(os.path.exists(marker) for marker in CONTAINER_MARKERS)
+    if in_container and get_mount_point(settings.ARCHIVE_ROOT) == "/":
+        raise ImproperlyConfigured(f"ARCHIVE_ROOT {settings.ARCHIVE_ROOT} is not on a mounted volume")
+
+
+def archive_queryset(
+    queryset: models.QuerySet,
+    name: str,
+    time_field: str,
+    fields: List[str],
+    on_batch: Callable[[List[dict]], None] = None,
+) -> int:
+    """
+    move rows into gzip ndjson files by month in id ordered batches, then delete them
+
+    files are written before rows are deleted, so a crash in between may archive a batch twice but never loses it
+    """
+
+    check_archive_root()
+    archived = 0
+    last_id = 0
+    while True:
+        # old rows have small ids, walking the primary key stops early
+        rows = list(queryset.filter(id__gt=last_id).order_by("id").values("id", *fields)[: settings.ARCHIVE_BATCH_SIZE])
+        if not rows:
+            return archived
+        write_archive(name, time_field, rows)
+        with transaction.atomic():
+            if on_batch:
+                on_batch(rows)
+            queryset.model.objects.filter(id__in=[row["id"] for row in rows]).delete()
+        last_id = rows[-1]["id"]
+        archived += len(rows)
+
+
+def write_archive(name: str, time_field: str, rows: List[dict]) -> None:
+    # group by month of the row, each batch appends a gzip member to the file
+    months: Dict[str, List[dict]] = {}
+    for row in rows:
+        months.setdefault(timezone.localtime(row[time_field]).strftime("%Y-%m"), []).append(row)
+    os.makedirs(os.path.join(settings.ARCHIVE_ROOT, name), exist_ok=True)
+    for month, month_rows in months.items():
+        with gzip.open(os.path.join(settings.ARCHIVE_ROOT, name, f"{month}.ndjson.gz"), "at", encoding="utf-8") as file:
+            for row in month_rows:
+                file.write(json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False) + "\n")
@@ -0,0 +1,18 @@
+import time
+
+from dj_db_conn_pool.backends.mysql import base
+
+from apps.core.pools import record_db_checkout
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    Pooled MySQL recording how long each checkout waits
+    """
+
+    def get_new_connection(self, conn_params):
+        start = time.perf_counter()
+        try:
+            return super().get_new_connection(conn_params)
+        finally:
+            record_db_checkout(self.alias, time.perf_counter() - start)
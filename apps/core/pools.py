@@ -0,0 +1,89 @@
+import threading
+from typing import Dict
+
+from dj_db_conn_pool.core import pool_container
+from django.conf import settings
+from django.core.cache import caches
+from django_redis.pool import ConnectionFactory
+from redis import ConnectionPool
+
+# alias -> checkout count and wait seconds of current process
+_db_checkouts: Dict[str, dict] = {}
+_db_checkouts_lock = threading.Lock()
+
+
+class RedisConnectionFactory(ConnectionFactory):
+    """
+    Keep one pool per role, so roles sharing an endpoint do not share connections
+    """
+
+    def get_or_create_connection_pool(self, params) -> ConnectionPool:
+        key = f"{self.options.get('POOL_ROLE', '')}:{params['url']}"
+        if key not in self._pools:
+            self._pools[key] = self.get_connection_pool(params)
+        return self._pools[key]
+
+
+def get_redis_pool_stats() -> Dict[str, dict]:
+    """
+    usage of redis pools in current process
+    """
+
+    # pylint: disable=W0212
+    stats = {}
+    for alias, config in settings.CACHES.items():
+        pool: ConnectionPool = caches[alias].client.get_client().connection_pool
+        stats[alias] = {
+            "role": config["OPTIONS"].get("POOL_ROLE", ""),
+            "max_connections": pool.max_connections,
+            "created_connections": pool._created_connections,
+            "in_use_connections": len(pool._in_use_connections),
+            "available_connections": len(pool._available_connections),
+        }
+    return stats
+
+
+def get_broker_pool_stats() -> dict:
+    """
+    usage of celery broker pool in current process
+    """
+
+    # pylint: disable=C0415,W0212
+    from apps.cel import app
+
+    pool = app.pool
+    return {
+        "role": "broker",
+        "max_connections": pool.limit,
+        "in_use_connections": len(pool._dirty),
+        "available_connections": pool._resource.qsize(),
+    }
+
+
+def record_db_checkout(alias: str, wait: float) -> None:
+    with _db_checkouts_lock:
+        checkouts = _db_checkouts.setdefault(alias, {"count": 0, "total_wait": 0.0, "max_wait": 0.0})
+        checkouts["count"] += 1
+        checkouts["total_wait"] += wait
+        checkouts["max_wait"] = max(checkouts["max_wait"], wait)
+
+
+def get_db_pool_stats() -> Dict[str, dict]:
+    """
+    usage of database pools in current process
+    """
+
+    stats = {}
+    for alias, pool in pool_container.items():
+        checkouts = _db_checkouts.get(alias, {"count": 0, "total_wait": 0.0, "max_wait": 0.0})
+        avg_wait = checkouts["total_wait"] / checkouts["count"] if checkouts["count"] else 0
+        stats[alias] = {
+            "pool_size": pool.size(),
+            "in_use_connections": pool.checkedout(),
+            "available_connections": pool.checkedin(),
+            "overflow_connections": max(pool.overflow(), 0),
+            "checkouts": checkouts["count"],
+            "avg_checkout_ms": round(avg_wait * 1000, 3),
+            "max_checkout_ms": round(checkouts["max_wait"] * 1000, 3),
+        }
+    return stats
@@ -0,0 +1,51 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA_DB_ALIAS = "replica"
+
+_use_replica: ContextVar[bool] = ContextVar("use_replica", default=False)
+_pinned: ContextVar[bool] = ContextVar("pinned", default=False)
+
+
+@contextmanager
+def use_replica():
+    """
+    send reads inside to the replica, until something is written
+    """
+
+    use_token = _use_replica.set(REPLICA_DB_ALIAS in settings.DATABASES)
+    pinned_token = _pinned.set(False)
+    try:
+        yield
+    finally:
+        _pinned.reset(pinned_token)
+        _use_replica.reset(use_token)
+
+
+class ReplicaRouter:
+    """
+    Route reads to the replica inside use_replica, everything else to the primary
+    """
+
+    def db_for_read(self, model, **hints) -> str:
+        if not _use_replica.get() or _pinned.get():
+            return DEFAULT_DB_ALIAS
+        # reads inside a transaction should see its own writes
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return REPLICA_DB_ALIAS
+
+    def db_for_write(self, model, **hints) -> str:
+        # later reads in the same scope should see this write
+        if _use_replica.get():
+            _pinned.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints) -> bool:
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints) -> bool:
+        return db == DEFAULT_DB_ALIAS
@@ -0,0 +1,98 @@
+import time
+from typing import Dict, Tuple
+
+import msgpack
+from django.conf import settings
+from django.contrib.sessions.backends.base import UpdateError
+from django.contrib.sessions.backends.cache import CreateError
+from django.contrib.sessions.backends.cache import SessionStore as CacheSessionStore
+from django.core.cache import caches
+from django.utils import timezone
+from ovinc_client.account.models import UserToken
+
+# session key -> (expires at, session data), bounded by SESSION_LOCAL_CACHE_SIZE
+_local_sessions: Dict[str, Tuple[float, dict]] = {}
+
+
+class SessionStore(CacheSessionStore):
+    """
+    Session stored in redis as msgpack, skipping pickle and the extra GET on save
+
+    Loaded sessions can be kept in process for SESSION_LOCAL_CACHE_TIMEOUT seconds,
+    so a logout in one worker takes up to that long to reach the others
+    """
+
+    cache_key_prefix = "apps.core.sessions"
+
+    @property
+    def redis_key(self) -> str:
+        # same key as cache.delete(cache_key) uses, so revoking tokens keeps working
+        return str(self._cache.make_key(self.cache_key))
+
+    def load(self) -> dict:
+        session_key = self._get_or_create_session_key()
+        local = _local_sessions.get(session_key)
+        if local and local[0] > time.monotonic():
+            return dict(local[1])
+        try:
+            data = self._cache.client.get_client().get(self.redis_key)
+            session_data = msgpack.unpackb(data) if data is not None else None
+        except Exception:  # pylint: disable=W0718
+            session_data = None
+        if session_data is not None:
+            self._remember(session_key, session_data)
+            return session_data
+        self._session_key = None
+        return {}
+
+    def save(self, must_create: bool = False) -> None:
+        if self.session_key is None:
+            self.create()
+            return
+        session_data = self._get_session(no_load=must_create)
+        result = self._cache.client.get_client().set(
+            self.redis_key,
+            msgpack.packb(session_data),
+            ex=self.get_expiry_age(),
+            nx=must_create,
+            xx=not must_create,
+        )
+        if not result:
+            raise CreateError if must_create else UpdateError
+        self._remember(self.session_key, session_data)
+
+    def exists(self, session_key: str) -> bool:
+        return bool(session_key) and bool(
+            self._cache.client.get_client().exists(str(self._cache.make_key(self.cache_key_prefix + session_key)))
+        )
+
+    def delete(self, session_key: str = None) -> None:
+        session_key = session_key or self.session_key
+        if session_key is None:
+            return
+        _local_sessions.pop(session_key, None)
+        super().delete(session_key)
+
+    def _remember(self, session_key: str, session_data: dict) -> None:
+        if not settings.SESSION_LOCAL_CACHE_TIMEOUT:
+            return
+        if len(_local_sessions) >= settings.SESSION_LOCAL_CACHE_SIZE:
+            _local_sessions.clear()
+        _local_sessions[session_key] = (
+            time.monotonic() + settings.SESSION_LOCAL_CACHE_TIMEOUT,
+            dict(session_data),
+        )
+
+
+def logout_all(user) -> None:
+    """
+    Logout all token, deleting sessions from the session cache instead of the default one
+    """
+
+    session_cache = caches[settings.SESSION_CACHE_ALIAS]
+    # pylint: disable=E1101
+    tokens = UserToken.objects.filter(user=user, expired_at__gte=timezone.now())
+    for token in tokens:
+        _local_sessions.pop(token.session_key, None)
+        session_cache.delete(token.cache_key)
+    tokens.update(expired_at=timezone.now())
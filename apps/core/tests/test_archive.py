@@ -0,0 +1,61 @@
+import gzip
+import json
+import os
+import tempfile
+from unittest import mock
+
+from django.core.exceptions import ImproperlyConfigured
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from ovinc_client.account.models import User
+
+from apps.core import archive
+from apps.core.archive import archive_queryset
+from apps.tcaptcha.models import TCaptchaHistory
+
+
+class ArchiveTestCase(TestCase):
+    """
+    Archive rows into files that outlive the container
+    """
+
+    def setUp(self):
+        self.archive_root = tempfile.TemporaryDirectory()  # pylint: disable=R1732
+        user = User.objects.create(username="user")
+        TCaptchaHistory.objects.create(user=user, client_ip="127.0.0.1")
+
+    def tearDown(self):
+        self.archive_root.cleanup()
+
+    def archive(self):
+        return archive_queryset(
+            queryset=TCaptchaHistory.objects.all(),
+            name="tcaptcha_history",
+            time_field="verify_at",
+            fields=["user_id", "verify_at"],
+        )
+
+    def test_archive(self):
+        with override_settings(ARCHIVE_ROOT=self.archive_root.name), mock.patch.object(
+            archive, "CONTAINER_MARKERS", ()
+        ):
+            self.assertEqual(self.archive(), 1)
+        self.assertFalse(TCaptchaHistory.objects.exists())
+        path = os.path.join(
+            self.archive_root.name, "tcaptcha_history", f"{timezone.localtime().strftime('%Y-%m')}.ndjson.gz"
+        )
+        with gzip.open(path, "rt", encoding="utf-8") as file:
+            self.assertEqual(len([json.loads(line) for line in file]), 1)
+
+    def test_refuse_without_root(self):
+        for archive_root in ["", os.path.join(self.archive_root.name, "missing")]:
+            with override_settings(ARCHIVE_ROOT=archive_root), self.assertRaises(ImproperlyConfigured):
+                self.archive()
+        self.assertTrue(TCaptchaHistory.objects.exists())
+
+    def test_refuse_on_container_filesystem(self):
+        with override_settings(ARCHIVE_ROOT=self.archive_root.name), mock.patch.object(
+            archive, "CONTAINER_MARKERS", (self.archive_root.name,)
+        ), mock.patch.object(archive, "get_mount_point", return_value="/"), self.assertRaises(ImproperlyConfigured):
+            self.archive()
+        self.assertTrue(TCaptchaHistory.objects.exists())
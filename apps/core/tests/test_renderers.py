@@ -0,0 +1,45 @@
+import datetime
+import json
+from decimal import Decimal
+
+from django.test import SimpleTestCase, override_settings
+from ovinc_client.core.renderers import APIRenderer
+from rest_framework.test import APIRequestFactory
+
+from apps.core.renderers import ORJSONAPIRenderer
+
+
+class ORJSONAPIRendererTestCase(SimpleTestCase):
+    """
+    Same body as APIRenderer
+    """
+
+    def setUp(self):
+        request = APIRequestFactory().get("/")
+        request.otel_trace_id = "trace"
+        self.renderer_context = {"request": request}
+
+    def assert_same_body(self, make_data) -> None:
+        expected = json.loads(APIRenderer().render(make_data(), renderer_context=self.renderer_context))
+        rendered = ORJSONAPIRenderer().render(make_data(), renderer_context=self.renderer_context)
+        self.assertIsInstance(rendered, bytes)
+        self.assertEqual(json.loads(rendered), expected)
+
+    def test_envelope(self):
+        self.assert_same_body(lambda: None)
+        self.assert_same_body(lambda: [1, "a", None])
+        self.assert_same_body(lambda: "plain")
+        self.assert_same_body(lambda: {"id": 1, "name": "名称"})
+        self.assert_same_body(lambda: {"message": "created", "data": {"id": 1}})
+        self.assert_same_body(lambda: {"message": "failed", "detail": "error"})
+        self.assert_same_body(lambda: {"count": 1, "results": [{"id": 1}]})
+
+    def test_encoder_fallback(self):
+        data = {"at": datetime.datetime(2024, 1, 1, 8, 0), "price": Decimal("1.50"), 1: "key"}
+        body = json.loads(ORJSONAPIRenderer().render(data, renderer_context=self.renderer_context))
+        self.assertEqual(body["data"], {"at": "2024-01-01T08:00:00", "price": 1.5, "1": "key"})
+
+    @override_settings(API_ORJSON_ENABLED=False)
+    def test_disabled(self):
+        rendered = ORJSONAPIRenderer().render({"id": 1}, renderer_context=self.renderer_context)
+        self.assertEqual(rendered, APIRenderer().render({"id": 1}, renderer_context=self.renderer_context))
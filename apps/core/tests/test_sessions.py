@@ -0,0 +1,41 @@
+import datetime
+
+from django.conf import settings
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from ovinc_client.account.models import User, UserToken
+
+from apps.core.sessions import SessionStore
+
+# sessions on another redis db than the default cache
+SESSION_CACHES = {
+    **settings.CACHES,
+    "session": {**settings.CACHES["session"], "LOCATION": "redis://localhost:6379/1"},
+}
+
+
+@override_settings(CACHES=SESSION_CACHES, SESSION_ENGINE="apps.core.sessions")
+class LogoutAllTestCase(TestCase):
+    """
+    Revoke all sessions of one user
+    """
+
+    # pylint: disable=E1101
+    def test_logout_all(self):
+        user = User.objects.create(username="user")
+        session = SessionStore()
+        session["user"] = user.username
+        session.create()
+        UserToken.objects.create(
+            user=user,
+            session_key=session.session_key,
+            cache_key=session.cache_key,
+            login_ip="127.0.0.1",
+            expired_at=timezone.now() + datetime.timedelta(days=1),
+        )
+        self.assertTrue(SessionStore().exists(session.session_key))
+        user.logout_all()
+        self.assertFalse(SessionStore().exists(session.session_key))
+        self.assertFalse(caches["session"].client.get_client().keys("*"))
+        self.assertFalse(UserToken.objects.filter(user=user, expired_at__gte=timezone.now()).exists())
@@ -0,0 +1,42 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+from rest_framework.test import APIRequestFactory
+
+from apps.core.throttling import IPRedisRateThrottle
+
+
+class ThreePerSecondThrottle(IPRedisRateThrottle):
+    scope = "test"
+    rate = "3/s"
+
+
+class RedisRateThrottleTestCase(SimpleTestCase):
+    """
+    GCRA throttle
+    """
+
+    def setUp(self):
+        cache.client.get_client().flushall()
+        self.request = APIRequestFactory().get("/")
+
+    def allow_request(self, now: float) -> bool:
+        with mock.patch("apps.core.throttling.time.time", return_value=now):
+            return ThreePerSecondThrottle().allow_request(self.request, None)
+
+    def test_burst(self):
+        now = 1_000_000.0
+        self.assertEqual([self.allow_request(now) for _ in range(4)], [True, True, True, False])
+
+    def test_fractional_wait(self):
+        now = 1_000_000.0
+        for _ in range(3):
+            self.assertTrue(self.allow_request(now))
+        # a third of a millisecond early
+        throttle = ThreePerSecondThrottle()
+        with mock.patch("apps.core.throttling.time.time", return_value=now + 0.333):
+            self.assertFalse(throttle.allow_request(self.request, None))
+        self.assertGreater(throttle.wait(), 0)
+        self.assertTrue(self.allow_request(now + 0.334))
+        self.assertFalse(self.allow_request(now + 0.334))
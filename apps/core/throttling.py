@@ -0,0 +1,74 @@
+import time
+
+from ovinc_client.core.utils import get_ip
+from rest_framework.throttling import SimpleRateThrottle
+
+from apps.core.utils import get_script
+
+# GCRA, KEYS: throttle; ARGV: emission interval, period, now (in microseconds)
+# integers keep the burst exact, redis would truncate a fractional wait to 0 and allow the request
+GCRA_SCRIPT = """
+local interval = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local tat = tonumber(redis.call("GET", KEYS[1]) or now)
+if tat < now then
+    tat = now
+end
+local new_tat = tat + interval
+if new_tat - period > now then
+    return new_tat - period - now
+end
+redis.call("SET", KEYS[1], new_tat, "PX", math.ceil(period / 1000))
+return 0
+"""
+
+
+class RedisRateThrottle(SimpleRateThrottle):
+    """
+    Rate Throttle checked by one atomic redis call
+    """
+
+    cache_format = "throttle:%(scope)s:%(ident)s"
+
+    def __init__(self):
+        super().__init__()
+        self.key = None
+        self.wait_us = 0
+
+    def get_cache_key(self, request, view) -> str:
+        raise NotImplementedError()
+
+    def allow_request(self, request, view) -> bool:
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+        period = self.duration * 1_000_000
+        self.wait_us = get_script(GCRA_SCRIPT)(
+            keys=[self.key], args=[period // self.num_requests, period, int(time.time() * 1_000_000)]
+        )
+        return not self.wait_us
+
+    def wait(self) -> float:
+        return self.wait_us / 1_000_000
+
+
+class UserRedisRateThrottle(RedisRateThrottle):
+    """
+    Throttle by user, anonymous user by ip
+    """
+
+    def get_cache_key(self, request, view) -> str:
+        ident = request.user.pk if request.user and request.user.is_authenticated else get_ip(request)
+        return self.cache_format % {"scope": self.scope, "ident": ident}
+
+
+class IPRedisRateThrottle(RedisRateThrottle):
+    """
+    Throttle by ip
+    """
+
+    def get_cache_key(self, request, view) -> str:
+        return self.cache_format % {"scope": self.scope, "ident": get_ip(request)}
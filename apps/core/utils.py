@@ -0,0 +1,32 @@
+from functools import lru_cache
+from typing import List
+
+from django.core.cache import caches
+from django.db import connections, models, router
+from django.utils.connection import ConnectionProxy
+from django_redis.cache import RedisCache
+from redis.commands.core import Script
+
+# hot stock and claims, kept apart from the response cache
+stock_cache: RedisCache = ConnectionProxy(caches, "stock")
+
+
+@lru_cache
+def get_script(source: str, alias: str = "default") -> Script:
+    return caches[alias].client.get_client().register_script(source)
+
+
+def upsert(inst: models.Model, update_fields: List[str], unique_fields: List[str]) -> None:
+    """
+    insert or update in one statement, such as INSERT ... ON DUPLICATE KEY UPDATE
+    """
+
+    model = inst.__class__
+    features = connections[router.db_for_write(model)].features
+    model.objects.bulk_create(
+        objs=[inst],
+        update_conflicts=True,
+        update_fields=update_fields,
+        # mysql detects conflicts on any unique key and rejects explicit targets
+        unique_fields=unique_fields if features.supports_update_conflicts_with_target else None,
+    )
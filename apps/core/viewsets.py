@@ -0,0 +1,128 @@
+from typing import List, Tuple, Type
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from ovinc_client.core.utils import get_md5
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+
+from apps.core.exceptions import IdempotencyConflict
+from apps.core.routers import use_replica
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+IDEMPOTENCY_PROCESSING = "processing"
+
+
+class ReplicaReadMixin:
+    """
+    Serve read only actions listed in replica_actions from the replica
+    """
+
+    replica_actions: List[str] = []
+
+    def dispatch(self, request, *args, **kwargs):
+        action = self.action_map.get(request.method.lower())
+        if request.method not in SAFE_METHODS or action not in self.replica_actions:
+            return super().dispatch(request, *args, **kwargs)
+        with use_replica():
+            return super().dispatch(request, *args, **kwargs)
+
+
+class IdempotentReplay(Exception):
+    """
+    Raised to skip the handler and return the stored response
+    """
+
+    def __init__(self, stored: dict):
+        super().__init__()
+        self.stored = stored
+
+    @property
+    def response(self) -> HttpResponse:
+        if "content" in self.stored:
+            return HttpResponse(
+                self.stored["content"], status=self.stored["status"], content_type=self.stored["content_type"]
+            )
+        return Response(self.stored["data"], status=self.stored["status"])
+
+
+class IdempotentMixin:
+    """
+    Replay the first result of actions in idempotent_actions for retries with the same Idempotency-Key
+
+    Retries skip permissions, throttles and the handler, errors the client can recover from are not kept
+    """
+
+    idempotent_actions: List[str] = []
+    idempotent_retryable_exceptions: Tuple[Type[Exception], ...] = ()
+    idempotency_cache_key: str = ""
+    idempotency_stored: dict = None
+    idempotency_owner: bool = False
+    idempotency_error: Exception = None
+
+    def initial(self, request, *args, **kwargs):
+        if self.action in self.idempotent_actions and request.headers.get(IDEMPOTENCY_HEADER):
+            self.idempotency_cache_key = (
+                f"idempotency:{self.__class__.__name__}:{self.action}:{request.user.username}:"
+                f"{get_md5([get_md5(kwargs), request.headers[IDEMPOTENCY_HEADER]])}"
+            )
+            self.idempotency_stored = cache.get(self.idempotency_cache_key)
+        super().initial(request, *args, **kwargs)
+        if self.idempotency_stored == IDEMPOTENCY_PROCESSING:
+            raise IdempotencyConflict()
+        if self.idempotency_stored is not None:
+            raise IdempotentReplay(self.idempotency_stored)
+        if not self.idempotency_cache_key:
+            return
+        # concurrent retries wait for the first one
+        if not cache.add(
+            self.idempotency_cache_key, IDEMPOTENCY_PROCESSING, timeout=settings.IDEMPOTENCY_PROCESSING_TIMEOUT
+        ):
+            raise IdempotencyConflict()
+        self.idempotency_owner = True
+
+    def check_permissions(self, request):
+        if self.idempotency_stored is not None:
+            return
+        super().check_permissions(request)
+
+    def check_throttles(self, request):
+        if self.idempotency_stored is not None:
+            return
+        super().check_throttles(request)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, IdempotentReplay):
+            return exc.response
+        self.idempotency_error = exc
+        try:
+            return super().handle_exception(exc)
+        except Exception:
+            self.release_idempotency()
+            raise
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if not self.idempotency_owner:
+            return response
+        if isinstance(self.idempotency_error, self.idempotent_retryable_exceptions):
+            self.release_idempotency()
+            return response
+        # error responses are rendered by the exception handler already
+        if isinstance(response, Response):
+            stored = {"status": response.status_code, "data": response.data}
+        else:
+            stored = {
+                "status": response.status_code,
+                "content": response.content,
+                "content_type": response["Content-Type"],
+            }
+        cache.set(self.idempotency_cache_key, stored, timeout=settings.IDEMPOTENCY_TIMEOUT)
+        self.idempotency_owner = False
+        return response
+
+    def release_idempotency(self) -> None:
+        if self.idempotency_owner:
+            cache.delete(self.idempotency_cache_key)
+            self.idempotency_owner = False
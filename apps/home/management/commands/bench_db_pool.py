@@ -0,0 +1,81 @@
+import math
+import threading
+import time
+
+from django.core.management import BaseCommand
+from django.db import connections
+
+from apps.core.pools import get_db_pool_stats
+
+
+class Command(BaseCommand):
+    """
+    Benchmark Database Pool
+    """
+
+    help = "load the database pool with concurrent short queries and recommend pool sizes"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.alias = "default"
+        self.waits = []
+        self.holds = []
+        self.peak = {"in_use": 0, "overflow": 0}
+        self.lock = threading.Lock()
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default="default")
+        parser.add_argument("--threads", type=int, default=50)
+        parser.add_argument("--requests", type=int, default=100, help="requests per thread")
+        parser.add_argument("--hold-ms", type=float, default=5, help="time a request holds its connection")
+
+    def handle(self, *args, **options):
+        self.alias = options["database"]
+
+        # load
+        start = time.perf_counter()
+        threads = [
+            threading.Thread(target=self.work, args=(options["requests"], options["hold_ms"]))
+            for _ in range(options["threads"])
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        cost = time.perf_counter() - start
+
+        # report
+        waits = sorted(self.waits)
+        throughput = len(waits) / cost
+        self.stdout.write(
+            f"[{self.alias}] {len(waits)} requests in {cost:.2f}s, {throughput:.1f}/s; "
+            f"checkout p50 {waits[len(waits) // 2] * 1000:.2f}ms "
+            f"p99 {waits[int(len(waits) * 0.99)] * 1000:.2f}ms "
+            f"max {waits[-1] * 1000:.2f}ms; "
+            f"peak in use {self.peak['in_use']}, peak overflow {self.peak['overflow']}"
+        )
+        # connections busy on average by little's law, with headroom for bursts
+        pool_size = max(math.ceil(throughput * sum(self.holds) / len(self.holds) * 1.5), 1)
+        max_overflow = max(self.peak["in_use"], options["threads"]) - pool_size
+        self.stdout.write(
+            f"Recommended per process: DB_POOL_SIZE={pool_size} DB_POOL_MAX_OVERFLOW={max(max_overflow, 0)}"
+        )
+
+    def work(self, requests: int, hold_ms: float) -> None:
+        connection = connections[self.alias]
+        for _ in range(requests):
+            # check out like a request does, then release on close
+            start = time.perf_counter()
+            connection.ensure_connection()
+            checked_out = time.perf_counter()
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            time.sleep(hold_ms / 1000)
+            stats = get_db_pool_stats().get(self.alias, {})
+            connection.close()
+            with self.lock:
+                self.waits.append(checked_out - start)
+                self.holds.append(time.perf_counter() - checked_out)
+                self.peak["in_use"] = max(self.peak["in_use"], stats.get("in_use_connections", 0))
+                self.peak["overflow"] = max(self.peak["overflow"], stats.get("overflow_connections", 0))
+        connections.close_all()
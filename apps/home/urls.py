@@ -1,9 +1,10 @@
 from rest_framework.routers import DefaultRouter
 
-from apps.home.views import HomeView, I18nViewSet
+from apps.home.views import HealthViewSet, HomeView, I18nViewSet
 
 router = DefaultRouter()
 router.register("", HomeView)
 router.register("i18n", I18nViewSet, basename="i18n")
+router.register("health", HealthViewSet, basename="health")
 
 urlpatterns = router.urls
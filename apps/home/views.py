@@ -4,9 +4,17 @@ from django.contrib.auth import get_user_model
 from ovinc_client.account.models import User
 from ovinc_client.core.auth import SessionAuthenticate
 from ovinc_client.core.viewsets import MainViewSet
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAdminUser
 from rest_framework.response import Response
 
+from apps.core.pools import (
+    get_broker_pool_stats,
+    get_db_pool_stats,
+    get_redis_pool_stats,
+)
 from apps.home.serializers import I18nRequestSerializer
+from apps.vcd.models import VirtualContent
 
 USER_MODEL: User = get_user_model()
 
@@ -58,3 +66,34 @@ class I18nViewSet(MainViewSet):
             samesite=settings.SESSION_COOKIE_SAMESITE,
         )
         return response
+
+
+class HealthViewSet(MainViewSet):
+    """
+    Health
+    """
+
+    enable_record_log = False
+    permission_classes = [IsAdminUser]
+
+    def list(self, request, *args, **kwargs):
+        """
+        Pool Usage of Current Process
+        """
+
+        return Response(
+            {
+                "database": get_db_pool_stats(),
+                "redis": get_redis_pool_stats(),
+                "broker": get_broker_pool_stats(),
+                "channel": {"role": "channel", "max_connections": settings.REDIS_ROLES["channel"]["max_connections"]},
+            }
+        )
+
+    @action(methods=["GET"], detail=False)
+    def stock(self, request, *args, **kwargs):
+        """
+        Stock Drift Found by the Last Reconcile
+        """
+
+        return Response({"drifts": VirtualContent.get_stock_drifts()})
@@ -6,3 +6,12 @@ class OauthConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.oauth"
     verbose_name = gettext_lazy("OAuth Module")
+
+    def ready(self):
+        # pylint: disable=C0415
+        from ovinc_client.account.models import User
+
+        from apps.core.sessions import logout_all
+
+        # sessions live in their own cache
+        User.logout_all = logout_all
@@ -2,6 +2,7 @@ from django.utils.translation import gettext_lazy
 from ovinc_client.core.models import IntegerChoices
 
 STATE_CACHE_KEY = "oauth:login_state:{state}"
+PROFILE_SNAPSHOT_CACHE_KEY = "oauth:profile_snapshot:{username}"
 
 
 class TrustLevelChoices(IntegerChoices):
@@ -1,12 +1,20 @@
-from typing import Optional
+from typing import Dict, List, Optional
 
-from django.db import models
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import models, transaction
 from django.utils.translation import gettext_lazy
+from django_redis.cache import RedisCache
 from ovinc_client.core.constants import MAX_CHAR_LENGTH
 from ovinc_client.core.models import BaseModel
 from pydantic import BaseModel as PydanticBaseModel
 
-from apps.oauth.constants import TrustLevelChoices
+from apps.core.utils import upsert
+from apps.oauth.constants import PROFILE_SNAPSHOT_CACHE_KEY, TrustLevelChoices
+
+cache: RedisCache
 
 
 class OAuthUserInfo(PydanticBaseModel):
@@ -45,3 +53,103 @@ class UserProfile(BaseModel):
 
     def __str__(self) -> str:
         return f"{self.user}"
+
+    @classmethod
+    def sync_from_userinfo(cls, userinfo: OAuthUserInfo) -> "UserProfile":
+        """
+        save user and profile, writing only what changed
+        """
+
+        user_model = get_user_model()
+        # load user and profile in one query
+        user = user_model.objects.filter(username=userinfo.username).select_related("profile").first()
+        try:
+            user_profile = user.profile if user else None
+        except ObjectDoesNotExist:
+            user_profile = None
+        profile_fields = {
+            "email": userinfo.email,
+            "avatar": userinfo.avatar_url,
+            "trust_level": userinfo.trust_level,
+            "api_key": userinfo.api_key,
+        }
+        user_changed = user is None or user.nick_name != userinfo.name
+        profile_changed = user_profile is None or any(
+            getattr(user_profile, key) != val for key, val in profile_fields.items()
+        )
+        if not user_changed and not profile_changed:
+            return user_profile
+        # save to db
+        with transaction.atomic():
+            if user is None:
+                user = user_model(username=userinfo.username, nick_name=userinfo.name)
+                upsert(user, update_fields=["nick_name"], unique_fields=["username"])
+            elif user_changed:
+                user_model.objects.filter(username=user.username).update(nick_name=userinfo.name)
+                user.nick_name = userinfo.name
+            if user_profile is None:
+                user_profile = cls(user=user, **profile_fields)
+                upsert(user_profile, update_fields=list(profile_fields.keys()), unique_fields=["user"])
+            elif profile_changed:
+                cls.objects.filter(id=user_profile.id).update(**profile_fields)
+                for key, val in profile_fields.items():
+                    setattr(user_profile, key, val)
+        return user_profile
+
+
+class ProfileSnapshot(PydanticBaseModel):
+    """
+    Compact profile cached for hot paths
+    """
+
+    username: str
+    nick_name: Optional[str] = None
+    avatar: Optional[str] = None
+    trust_level: int
+
+    @classmethod
+    def get_cache_key(cls, username: str) -> str:
+        return PROFILE_SNAPSHOT_CACHE_KEY.format(username=username)
+
+    @classmethod
+    def from_profile(cls, profile: UserProfile) -> "ProfileSnapshot":
+        return cls(
+            username=profile.user.username,
+            nick_name=profile.user.nick_name,
+            avatar=profile.avatar,
+            trust_level=profile.trust_level,
+        )
+
+    def save(self) -> None:
+        cache.set(
+            key=self.get_cache_key(self.username),
+            value=self.model_dump(),
+            timeout=settings.OAUTH_PROFILE_SNAPSHOT_TIMEOUT,
+        )
+
+    @classmethod
+    def load(cls, username: str) -> "ProfileSnapshot":
+        snapshot = cache.get(key=cls.get_cache_key(username))
+        if snapshot:
+            return cls.model_validate(snapshot)
+        snapshot = cls.from_profile(UserProfile.objects.select_related("user").get(user_id=username))
+        snapshot.save()
+        return snapshot
+
+    @classmethod
+    def load_many(cls, usernames: List[str]) -> Dict[str, "ProfileSnapshot"]:
+        # load from cache
+        cached = cache.get_many(keys=[cls.get_cache_key(username) for username in set(usernames)])
+        snapshots = {snapshot["username"]: cls.model_validate(snapshot) for snapshot in cached.values()}
+        # load missing from db
+        missing = set(usernames) - set(snapshots.keys())
+        if not missing:
+            return snapshots
+        profiles = UserProfile.objects.filter(user_id__in=missing).select_related("user")
+        loaded = {profile.user_id: cls.from_profile(profile) for profile in profiles}
+        cache.set_many(
+            data={cls.get_cache_key(username): snapshot.model_dump() for username, snapshot in loaded.items()},
+            timeout=settings.OAUTH_PROFILE_SNAPSHOT_TIMEOUT,
+        )
+        snapshots.update(loaded)
+        return snapshots
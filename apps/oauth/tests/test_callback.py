@@ -0,0 +1,113 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from ovinc_client.account.models import User
+from rest_framework.test import APIClient
+
+from apps.oauth.constants import STATE_CACHE_KEY
+from apps.oauth.utils import OAuthClient
+
+
+class MockProviderHandler(BaseHTTPRequestHandler):
+    """
+    Token and userinfo endpoints of a provider
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):  # pylint: disable=C0103
+        body = parse_qs(self.rfile.read(int(self.headers["Content-Length"])).decode())
+        self.server.calls.append((self.path, self.client_address, body))
+        self.send_json({"access_token": f"token-{body['code'][0]}", "token_type": "bearer"})
+
+    def do_GET(self):  # pylint: disable=C0103
+        self.server.calls.append((self.path.split("?")[0], self.client_address, self.headers["Authorization"]))
+        self.send_json(self.server.userinfo)
+
+    def send_json(self, data: dict) -> None:
+        content = json.dumps(data).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args):
+        return
+
+
+class OAuthCallbackTestCase(TestCase):
+    """
+    Code exchange against a mock provider
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), MockProviderHandler)
+        cls.server.calls = []
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        base_url = f"http://127.0.0.1:{cls.server.server_port}"
+        cls.settings_override = override_settings(
+            OAUTH2_CLIENT={
+                "provider": {
+                    **settings.OAUTH2_CLIENT["provider"],
+                    "access_token_url": f"{base_url}/token",
+                    "userinfo_url": f"{base_url}/user",
+                }
+            }
+        )
+        cls.settings_override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings_override.disable()
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.server.calls.clear()
+        self.server.userinfo = {
+            "id": 1,
+            "username": "user",
+            "active": True,
+            "trust_level": 2,
+            "email": "",
+            "avatar_url": "",
+            "api_key": "",
+        }
+
+    def callback(self, code: str):
+        cache.set(STATE_CACHE_KEY.format(state="state"), True)
+        return APIClient().post("/account/oauth/callback/", {"code": code, "state": "state"}, format="json")
+
+    def test_fetch_userinfo(self):
+        client = OAuthClient(redirect_uri="http://testserver/account/oauth/callback/")
+        userinfo = client.fetch_userinfo("code")
+        self.assertEqual((userinfo.username, userinfo.trust_level), ("user", 2))
+        client.fetch_userinfo("code")
+        self.assertEqual([call[0] for call in self.server.calls], ["/token", "/user"] * 2)
+        self.assertEqual(self.server.calls[0][2]["code"], ["code"])
+        self.assertEqual(self.server.calls[1][2], "Bearer token-code")
+        # the second exchange reuses the kept-alive connection
+        self.assertEqual(len({call[1] for call in self.server.calls}), 1)
+
+    def test_callback(self):
+        response = self.callback("code")
+        self.assertEqual(response.status_code, 200)
+        user = User.objects.get(username="user")
+        self.assertEqual(user.profile.trust_level, 2)
+        self.assertEqual(response.wsgi_request.session["_auth_user_id"], str(user.pk))
+
+    def test_callback_inactive(self):
+        self.server.userinfo["active"] = False
+        response = self.callback("code")
+        self.assertNotEqual(response.status_code, 200)
+        self.assertFalse(User.objects.filter(username="user").exists())
@@ -0,0 +1,56 @@
+from functools import lru_cache
+from typing import Optional
+
+from authlib.integrations.requests_client import OAuth2Session
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3 import Retry
+
+from apps.oauth.models import OAuthUserInfo
+
+
+@lru_cache
+def get_http_adapter() -> HTTPAdapter:
+    """
+    shared keep-alive pool for provider calls, only connect errors are retried
+    """
+
+    return HTTPAdapter(
+        pool_connections=settings.OAUTH_POOL_SIZE,
+        pool_maxsize=settings.OAUTH_POOL_SIZE,
+        max_retries=Retry(total=settings.OAUTH_RETRIES, connect=settings.OAUTH_RETRIES, read=0, status=0),
+    )
+
+
+class OAuthClient:
+    """
+    Exchange code for user info on the provider endpoints
+    """
+
+    def __init__(self, redirect_uri: str):
+        self.config = settings.OAUTH2_CLIENT["provider"]
+        self.redirect_uri = redirect_uri
+
+    @property
+    def proxies(self) -> Optional[dict]:
+        if not settings.OAUTH_PROXY_URL:
+            return None
+        return {"http": settings.OAUTH_PROXY_URL, "https": settings.OAUTH_PROXY_URL}
+
+    def fetch_userinfo(self, code: str) -> OAuthUserInfo:
+        # session is per request and never closed, closing it would drop the shared pool
+        oauth = OAuth2Session(
+            client_id=self.config["client_id"],
+            client_secret=self.config["client_secret"],
+            redirect_uri=self.redirect_uri,
+        )
+        adapter = get_http_adapter()
+        oauth.mount("http://", adapter)
+        oauth.mount("https://", adapter)
+        kwargs = {"verify": settings.OAUTH_SSL_VERIFY, "proxies": self.proxies, "timeout": settings.OAUTH_TIMEOUT}
+        # fetch token
+        token = oauth.fetch_token(self.config["access_token_url"], code=code, **kwargs)
+        # fetch user info
+        resp = oauth.get(self.config["userinfo_url"], params={"token": token}, **kwargs)
+        resp.raise_for_status()
+        return OAuthUserInfo.model_validate(resp.json())
@@ -1,8 +1,13 @@
+import datetime
+
+from django.conf import settings
+from django.utils import timezone
 from ovinc_client.core.lock import task_lock
 from ovinc_client.core.logger import celery_logger
 
 from apps.cel import app
-from apps.tcaptcha.models import TCaptchaBlackList
+from apps.core.archive import archive_queryset
+from apps.tcaptcha.models import TCaptchaBlackList, TCaptchaHistory
 from apps.tcaptcha.utils import TCaptchaVerify
 
 
@@ -17,3 +22,28 @@ def sync_blacklist(self):
     celery_logger.info("[SyncBlacklist] Count %d", len(users))
 
     celery_logger.info("[SyncBlacklist] End %s", self.request.id)
+
+
+@app.task(bind=True)
+@task_lock()
+def archive_histories(self):
+    celery_logger.info("[ArchiveTCaptchaHistories] Start %s", self.request.id)
+
+    if not settings.CAPTCHA_HISTORY_RETENTION_DAYS:
+        celery_logger.info("[ArchiveTCaptchaHistories] Disabled %s", self.request.id)
+        return
+
+    # never archive rows the blacklist check still counts
+    retention = max(
+        datetime.timedelta(days=settings.CAPTCHA_HISTORY_RETENTION_DAYS),
+        datetime.timedelta(seconds=settings.CAPTCHA_BLACKLIST_CHECK_SECONDS),
+    )
+    archived = archive_queryset(
+        queryset=TCaptchaHistory.objects.filter(verify_at__lt=timezone.now() - retention),
+        name="tcaptcha_history",
+        time_field="verify_at",
+        fields=["user_id", "client_ip", "is_success", "params", "result", "verify_at"],
+    )
+    celery_logger.info("[ArchiveTCaptchaHistories] Archived %d", archived)
+
+    celery_logger.info("[ArchiveTCaptchaHistories] End %s", self.request.id)
@@ -0,0 +1,5 @@
+from apps.core.throttling import UserRedisRateThrottle
+
+
+class CaptchaConfigThrottle(UserRedisRateThrottle):
+    scope = "tcaptcha_config"
@@ -12,6 +12,7 @@ from rest_framework.response import Response
 
 from apps.tcaptcha.exceptions import InvalidParams
 from apps.tcaptcha.serializers import CaptchaReqSerializer
+from apps.tcaptcha.throttling import CaptchaConfigThrottle
 from apps.tcaptcha.utils import TCaptchaVerify
 
 
@@ -20,7 +21,7 @@ class CaptchaViewSet(MainViewSet):
     Captcha
     """
 
-    @action(methods=["GET"], detail=False)
+    @action(methods=["GET"], detail=False, throttle_classes=[CaptchaConfigThrottle])
     def config(self, request: Request, *args, **kwargs) -> Response:
         """
         Captcha Config
@@ -1,6 +1,8 @@
 from django.contrib import admin
 
+from apps.core.admin import ReplicaAdminMixin
 from apps.vcd.models import (
+    HeaderProfile,
     ReceiveHistory,
     UserReceiveStats,
     UserShareStats,
@@ -10,7 +12,7 @@ from apps.vcd.models import (
 
 
 @admin.register(VirtualContent)
-class VirtualContentAdmin(admin.ModelAdmin):
+class VirtualContentAdmin(ReplicaAdminMixin, admin.ModelAdmin):
     list_display = [
         "id",
         "name",
@@ -26,16 +28,22 @@ class VirtualContentAdmin(admin.ModelAdmin):
 
 
 @admin.register(VirtualContentItem)
-class VirtualContentItemAdmin(admin.ModelAdmin):
+class VirtualContentItemAdmin(ReplicaAdminMixin, admin.ModelAdmin):
     list_display = ["id", "virtual_content"]
 
 
 @admin.register(ReceiveHistory)
-class ReceiveHistoryAdmin(admin.ModelAdmin):
+class ReceiveHistoryAdmin(ReplicaAdminMixin, admin.ModelAdmin):
     list_display = ["id", "virtual_content_item", "receiver", "received_at", "client_ip"]
     list_filter = ["virtual_content", "receiver", "client_ip"]
 
 
+@admin.register(HeaderProfile)
+class HeaderProfileAdmin(admin.ModelAdmin):
+    list_display = ["id", "header_hash"]
+    search_fields = ["header_hash"]
+
+
 @admin.register(UserReceiveStats)
 class UserReceiveStatsAdmin(admin.ModelAdmin):
     list_display = ["user", "count"]
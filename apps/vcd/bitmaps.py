@@ -0,0 +1,25 @@
+from typing import Iterable, List
+
+
+def encode_offsets(offsets: Iterable[int]) -> bytes:
+    """
+    redis bitmap with given offsets set, bit 0 is the highest bit of the first byte
+    """
+
+    offsets = list(offsets)
+    if not offsets:
+        return b""
+    data = bytearray(max(offsets) // 8 + 1)
+    for offset in offsets:
+        data[offset // 8] |= 0x80 >> (offset % 8)
+    return bytes(data)
+
+
+def decode_offsets(data: bytes) -> List[int]:
+    """
+    offsets set in a redis bitmap
+    """
+
+    return [
+        index * 8 + bit for index, byte in enumerate(data or b"") if byte for bit in range(8) if byte & (0x80 >> bit)
+    ]
@@ -0,0 +1,75 @@
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.utils import timezone
+from ovinc_client.core.logger import logger
+
+from apps.cel import app
+from apps.core.utils import stock_cache
+from apps.vcd.constants import ContentStatus
+from apps.vcd.models import VirtualContent
+
+
+def get_group_name(virtual_content_id: str) -> str:
+    return f"virtual_content.{virtual_content_id}"
+
+
+def get_broadcast_keys(virtual_content_id: str) -> (str, str):
+    return (
+        f"virtual_content:{virtual_content_id}:broadcast",
+        f"virtual_content:{virtual_content_id}:broadcast:trailing",
+    )
+
+
+def get_broadcast_interval() -> int:
+    # milliseconds between two pushes of one content
+    return max(1000 // settings.VCD_BROADCAST_RATE, 1)
+
+
+def get_stock_state(virtual_content: VirtualContent) -> dict:
+    now = timezone.now()
+    if now < virtual_content.start_time:
+        status = ContentStatus.NOT_OPEN
+    elif now > virtual_content.end_time:
+        status = ContentStatus.CLOSED
+    else:
+        status = ContentStatus.OPEN
+    return {
+        "id": virtual_content.id,
+        "status": status,
+        "stock": virtual_content.get_stock(),
+        "received": virtual_content.receive_histories.count() + virtual_content.archived_count,
+    }
+
+
+def send_stock(virtual_content: VirtualContent) -> None:
+    """
+    push current stock to viewers, never failing the caller
+    """
+
+    try:
+        async_to_sync(get_channel_layer().group_send)(
+            get_group_name(virtual_content.id), {"type": "stock.update", "data": get_stock_state(virtual_content)}
+        )
+    except Exception as err:  # pylint: disable=W0718
+        logger.warning("[SendStock] Failed %s; Error: %s", virtual_content.id, err)
+
+
+def broadcast_stock(virtual_content: VirtualContent) -> None:
+    """
+    push stock at most VCD_BROADCAST_RATE times per second, changes inside a window go out at its end
+    """
+
+    if not settings.VCD_BROADCAST_RATE:
+        return
+    interval = get_broadcast_interval()
+    window_key, trailing_key = get_broadcast_keys(virtual_content.id)
+    client = stock_cache.client.get_client()
+    if client.set(window_key, 1, nx=True, px=interval):
+        send_stock(virtual_content)
+        return
+    if client.set(trailing_key, 1, nx=True, px=interval):
+        # sent by name, tasks import this module
+        app.send_task(
+            "apps.vcd.tasks.push_stock", args=(virtual_content.id,), countdown=max(client.pttl(window_key), 0) / 1000
+        )
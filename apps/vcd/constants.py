@@ -0,0 +1,23 @@
+from django.utils.translation import gettext_lazy
+from ovinc_client.core.models import TextChoices
+
+
+class ExportFileType(TextChoices):
+    CSV = "csv", gettext_lazy("CSV")
+    NDJSON = "ndjson", gettext_lazy("NDJSON")
+
+
+class DistributionMode(TextChoices):
+    FCFS = "fcfs", gettext_lazy("First Come First Served")
+    LOTTERY = "lottery", gettext_lazy("Lottery")
+
+
+class ContentStatus(TextChoices):
+    NOT_OPEN = "not_open", gettext_lazy("Not Open")
+    OPEN = "open", gettext_lazy("Open")
+    CLOSED = "closed", gettext_lazy("Closed")
+
+
+class StockEncoding(TextChoices):
+    LIST = "list", gettext_lazy("List")
+    BITMAP = "bitmap", gettext_lazy("Bitmap")
@@ -0,0 +1,38 @@
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+
+from apps.vcd.broadcasts import get_group_name, get_stock_state
+from apps.vcd.models import VirtualContent
+
+
+class VirtualContentConsumer(AsyncJsonWebsocketConsumer):
+    """
+    Push stock, status and receive count of one virtual content
+    """
+
+    group_name: str = ""
+
+    async def connect(self) -> None:
+        if not self.scope["user"].is_authenticated:
+            await self.close()
+            return
+        state = await self.load_state(self.scope["url_route"]["kwargs"]["pk"])
+        if state is None:
+            await self.close()
+            return
+        self.group_name = get_group_name(state["id"])
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+        await self.send_json(state)
+
+    async def disconnect(self, code) -> None:
+        if self.group_name:
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def stock_update(self, event: dict) -> None:
+        await self.send_json(event["data"])
+
+    @database_sync_to_async
+    def load_state(self, virtual_content_id: str) -> dict:
+        virtual_content = VirtualContent.objects.filter(id=virtual_content_id).first()
+        return get_stock_state(virtual_content) if virtual_content else None
@@ -18,11 +18,26 @@ class VCClosed(APIException):
     default_detail = gettext_lazy("Virtual Content Is Closed")
 
 
+class VCArchived(APIException):
+    default_code = status.HTTP_403_FORBIDDEN
+    default_detail = gettext_lazy("Virtual Content Has Been Archived")
+
+
+class DistributionModeNotMatch(APIException):
+    default_code = status.HTTP_400_BAD_REQUEST
+    default_detail = gettext_lazy("Distribution Mode Not Match")
+
+
 class NoStock(APIException):
     default_code = status.HTTP_400_BAD_REQUEST
     default_detail = gettext_lazy("No Stock")
 
 
+class AdmissionRejected(APIException):
+    default_code = status.HTTP_403_FORBIDDEN
+    default_detail = gettext_lazy("Admission Queue Is Full")
+
+
 class AlreadyReceived(APIException):
     default_code = status.HTTP_403_FORBIDDEN
     default_detail = gettext_lazy("Already Received")
@@ -0,0 +1,72 @@
+import csv
+from typing import AsyncIterator, List
+
+import orjson
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils import timezone
+
+from apps.vcd.models import VirtualContent
+
+
+class Echo:
+    """
+    File like object handing written lines back to the caller
+    """
+
+    def write(self, value: str) -> str:
+        return value
+
+
+class ReceiveHistoryExporter:
+    """
+    Stream all receive histories of a content in id ordered batches, memory stays constant
+    """
+
+    fields = [
+        "id",
+        "receiver_id",
+        "receiver__nick_name",
+        "receiver__profile__trust_level",
+        "received_at",
+        "virtual_content_item_id",
+        "virtual_content_item__content",
+    ]
+    headers = ["id", "receiver", "receiver_nickname", "receiver_trust_level", "received_at", "item_id", "item_content"]
+
+    def __init__(self, virtual_content: VirtualContent):
+        self.virtual_content = virtual_content
+
+    def get_rows(self, last_id: int) -> List[list]:
+        # pylint: disable=E1101
+        rows = [
+            list(row)
+            for row in self.virtual_content.receive_histories.filter(id__gt=last_id)
+            .order_by("id")
+            .values_list(*self.fields)[: settings.VCD_EXPORT_BATCH_SIZE]
+        ]
+        for row in rows:
+            row[4] = timezone.localtime(row[4]).isoformat()
+        return rows
+
+    async def iter_rows(self) -> AsyncIterator[list]:
+        # asgi consumes sync iterators into one list before sending, an async one is sent batch by batch
+        last_id = 0
+        while True:
+            rows = await sync_to_async(self.get_rows)(last_id)
+            if not rows:
+                return
+            for row in rows:
+                yield row
+            last_id = rows[-1][0]
+
+    async def iter_csv(self) -> AsyncIterator[str]:
+        writer = csv.writer(Echo())
+        yield writer.writerow(self.headers)
+        async for row in self.iter_rows():
+            yield writer.writerow(row)
+
+    async def iter_ndjson(self) -> AsyncIterator[bytes]:
+        async for row in self.iter_rows():
+            # pylint: disable=E1101
+            yield orjson.dumps(dict(zip(self.headers, row))) + b"\n"
@@ -0,0 +1,97 @@
+import base64
+import hashlib
+import zlib
+from functools import lru_cache
+
+from Crypto.Cipher import AES
+from Crypto.Random import get_random_bytes
+from django.conf import settings
+from django.db import models
+
+# stored values starting with the marker are encoded, the next char tells how
+CONTENT_MARKER = "\x1f"
+COMPRESSED_TAG = "z"
+ENCRYPTED_TAG = "e"
+RAW_TAG = "r"
+
+NONCE_LENGTH = 12
+TAG_LENGTH = 16
+
+
+@lru_cache
+def get_content_key(secret: str) -> bytes:
+    return hashlib.sha256(secret.encode()).digest()
+
+
+def encrypt_content(value: str) -> str:
+    nonce = get_random_bytes(NONCE_LENGTH)
+    cipher = AES.new(get_content_key(settings.VCD_ITEM_ENCRYPT_KEY), AES.MODE_GCM, nonce=nonce)
+    cipher_text, tag = cipher.encrypt_and_digest(value.encode())
+    return f"{CONTENT_MARKER}{ENCRYPTED_TAG}{base64.b64encode(nonce + tag + cipher_text).decode()}"
+
+
+def decrypt_content(data: str) -> str:
+    data = base64.b64decode(data)
+    nonce, data = data[:NONCE_LENGTH], data[NONCE_LENGTH:]
+    tag, cipher_text = data[:TAG_LENGTH], data[TAG_LENGTH:]
+    cipher = AES.new(get_content_key(settings.VCD_ITEM_ENCRYPT_KEY), AES.MODE_GCM, nonce=nonce)
+    return cipher.decrypt_and_verify(cipher_text, tag).decode()
+
+
+def compress_content(value: str) -> str:
+    # compress long values only when it saves space
+    if settings.VCD_ITEM_COMPRESS_MIN_LENGTH and len(value) >= settings.VCD_ITEM_COMPRESS_MIN_LENGTH:
+        compressed = base64.b64encode(zlib.compress(value.encode(), level=9)).decode()
+        if len(compressed) + 2 < len(value):
+            return f"{CONTENT_MARKER}{COMPRESSED_TAG}{compressed}"
+    # escape plain values which look like encoded ones
+    if value.startswith(CONTENT_MARKER):
+        return f"{CONTENT_MARKER}{RAW_TAG}{value}"
+    return value
+
+
+def encode_content(value: str) -> str:
+    value = compress_content(value)
+    if settings.VCD_ITEM_ENCRYPT_KEY:
+        return encrypt_content(value)
+    return value
+
+
+def decode_content(value: str) -> str:
+    if not value.startswith(CONTENT_MARKER):
+        return value
+    tag, data = value[1:2], value[2:]
+    if tag == ENCRYPTED_TAG:
+        return decode_content(decrypt_content(data))
+    if tag == COMPRESSED_TAG:
+        return zlib.decompress(base64.b64decode(data)).decode()
+    return data
+
+
+class EncodedFieldMixin:
+    """
+    Encode values before saving and decode them after loading
+    """
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        return decode_content(value)
+
+    def get_prep_value(self, value):
+        value = super().get_prep_value(value)
+        if value is None:
+            return value
+        return encode_content(value)
+
+
+class CompressedCharField(EncodedFieldMixin, models.CharField):
+    """
+    Char Field storing long values compressed
+    """
+
+
+class EncodedTextField(EncodedFieldMixin, models.TextField):
+    """
+    Text Field storing values compressed or encrypted
+    """
@@ -0,0 +1,99 @@
+import atexit
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Optional
+
+from django.conf import settings
+
+from apps.core.utils import get_script
+from apps.vcd.scripts import LEASE_BITS_SCRIPT, LEASE_ITEMS_SCRIPT
+
+# items key -> lease of current process
+_leases: Dict[str, "Lease"] = {}
+_leases_lock = threading.Lock()
+
+
+class Lease:
+    """
+    Items taken from one shard at once, served to users of current process until serve_until
+
+    Leased items wait in the pending zset like reservations, so the reaper returns them if the process dies,
+    served ones are confirmed by the receiver once saved
+    """
+
+    # pylint: disable=R0913
+    def __init__(self, virtual_content, shard: int, item_ids: list, serve_until: float, deadline: float):
+        self.virtual_content = virtual_content
+        self.shard = shard
+        self.item_ids: Deque[int] = deque(int(item_id) for item_id in item_ids)
+        self.serve_until = serve_until
+        self.deadline = deadline
+
+    @property
+    def is_servable(self) -> bool:
+        return bool(self.item_ids) and self.serve_until > time.time()
+
+    def give_back(self) -> None:
+        # unserved items go back to stock
+        while True:
+            try:
+                item_id = self.item_ids.popleft()
+            except IndexError:
+                return
+            # past the deadline the reaper may have returned the item and another user reserved it again
+            if time.time() >= self.deadline:
+                self.item_ids.clear()
+                return
+            self.virtual_content.release_item(item_id)
+
+
+def take_leased_item(virtual_content, shard: int) -> Optional[int]:
+    """
+    serve one item from the lease of current process, leasing a new batch when it runs out
+    """
+
+    items_key = virtual_content.get_items_key(shard)
+    with _leases_lock:
+        lease = _leases.get(items_key)
+        if lease is not None and lease.is_servable:
+            return lease.item_ids.popleft()
+        _leases.pop(items_key, None)
+    # expired leases should not keep items away from other processes
+    if lease is not None:
+        lease.give_back()
+    # lease a new batch, reservations of served items still last VCD_RESERVATION_TIMEOUT
+    now = time.time()
+    deadline = now + settings.VCD_LEASE_TIMEOUT + settings.VCD_RESERVATION_TIMEOUT
+    args = [deadline, settings.VCD_LEASE_SIZE, settings.VCD_LEASE_MIN_STOCK]
+    if virtual_content.is_bitmap_stock:
+        script = get_script(LEASE_BITS_SCRIPT, "stock")
+        args += [virtual_content.stock_base_offset, max(virtual_content.stock_shards, 1), shard]
+    else:
+        script = get_script(LEASE_ITEMS_SCRIPT, "stock")
+    item_ids = script(keys=[items_key, virtual_content.get_pending_key(shard)], args=args)
+    if not item_ids:
+        return None
+    lease = Lease(virtual_content, shard, item_ids, now + settings.VCD_LEASE_TIMEOUT, deadline)
+    item_id = lease.item_ids.popleft()
+    if lease.item_ids:
+        with _leases_lock:
+            previous = _leases.get(items_key)
+            _leases[items_key] = lease
+        # another thread leased at the same time
+        if previous is not None:
+            previous.give_back()
+    return item_id
+
+
+@atexit.register
+def give_back_leases() -> None:
+    with _leases_lock:
+        leases = list(_leases.values())
+        _leases.clear()
+    for lease in leases:
+        try:
+            lease.give_back()
+        except Exception:  # pylint: disable=W0718
+            # the reaper returns them after the deadline
+            continue
@@ -0,0 +1,41 @@
+import time
+
+from django.core.management import BaseCommand
+from django.test import override_settings
+
+from apps.vcd.fields import decode_content, encode_content
+
+
+class Command(BaseCommand):
+    """
+    Benchmark Item Content Encoding
+    """
+
+    help = "measure the overhead of encrypting items on import and decrypting a page of items"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--items", type=int, default=10000)
+        parser.add_argument("--page-size", type=int, default=100)
+        parser.add_argument("--length", type=int, default=64)
+        parser.add_argument("--key", default="benchmark")
+
+    def handle(self, *args, **options):
+        contents = [f"{index:08d}".ljust(options["length"], "x") for index in range(options["items"])]
+        for name, key in [("plain", ""), ("encrypted", options["key"])]:
+            with override_settings(VCD_ITEM_ENCRYPT_KEY=key):
+                # import
+                start = time.perf_counter()
+                encoded = [encode_content(content) for content in contents]
+                import_cost = time.perf_counter() - start
+                # page
+                page = encoded[: options["page_size"]]
+                rounds = max(len(encoded) // len(page), 1)
+                start = time.perf_counter()
+                for _ in range(rounds):
+                    for value in page:
+                        decode_content(value)
+                page_cost = (time.perf_counter() - start) / rounds
+            self.stdout.write(
+                f"[{name}] import {import_cost * 1000:.2f}ms for {len(contents)} items; "
+                f"page of {len(page)} items {page_cost * 1000 * 1000:.1f}us per request"
+            )
@@ -0,0 +1,70 @@
+import time
+
+from django.core.management import BaseCommand
+from django.test import override_settings
+from django.utils import timezone
+from ovinc_client.core.renderers import APIRenderer
+from rest_framework.test import APIRequestFactory
+
+from apps.core.renderers import ORJSONAPIRenderer
+
+
+class Command(BaseCommand):
+    """
+    Benchmark Response Rendering
+    """
+
+    help = "compare APIRenderer and ORJSONAPIRenderer on receive history payloads"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rounds", type=int, default=2000)
+        parser.add_argument("--page-size", type=int, default=100)
+
+    def handle(self, *args, **options):
+        received_at = timezone.localtime().strftime("%Y-%m-%dT%H:%M:%S%z")
+        payloads = {
+            # VirtualContentViewSet.receive_history
+            "receive_history": {
+                "total": 10000,
+                "current": 1,
+                "results": [
+                    {
+                        "id": index,
+                        "receiver": f"user_{index}",
+                        "received_at": received_at,
+                        "receiver__nickname": f"用户 {index}",
+                        "receiver_trust_level": index % 5,
+                    }
+                    for index in range(options["page_size"])
+                ],
+            },
+            # ReceiveHistoryViewSet.list
+            "receive_history_list": {
+                "total": 1000,
+                "current": 1,
+                "results": [
+                    {
+                        "id": index,
+                        "received_at": received_at,
+                        "virtual_content": f"{index:032x}",
+                        "virtual_content_name": f"邀请码 {index}",
+                        "virtual_content_item_content": f"https://example.com/invite/{index:016x}",
+                    }
+                    for index in range(options["page_size"])
+                ],
+            },
+        }
+        context = {"request": APIRequestFactory().get("/")}
+        for name, payload in payloads.items():
+            for renderer_class in [APIRenderer, ORJSONAPIRenderer]:
+                renderer = renderer_class()
+                with override_settings(API_ORJSON_ENABLED=True):
+                    start = time.perf_counter()
+                    for _ in range(options["rounds"]):
+                        body = renderer.render(dict(payload), renderer_context=context)
+                    cost = time.perf_counter() - start
+                size = len(body if isinstance(body, bytes) else body.encode())
+                self.stdout.write(
+                    f"[{name}] {renderer_class.__name__}: {options['rounds'] / cost:.0f} renders/s, "
+                    f"{cost / options['rounds'] * 1000 * 1000:.1f}us per render, {size} bytes"
+                )
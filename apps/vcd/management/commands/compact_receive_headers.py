@@ -0,0 +1,40 @@
+import time
+
+from django.core.management import BaseCommand
+
+from apps.vcd.models import HeaderProfile, ReceiveHistory
+
+
+class Command(BaseCommand):
+    """
+    Compact Receive History Headers
+    """
+
+    help = "move full headers of receive histories into shared header profiles in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--sleep", type=float, default=0, help="seconds to sleep between batches")
+
+    def handle(self, *args, **options):
+        last_id = 0
+        compacted = 0
+        while True:
+            # walk by id so every batch is an index range scan
+            histories = list(
+                ReceiveHistory.objects.filter(id__gt=last_id, headers__isnull=False)
+                .order_by("id")
+                .only("id", "headers")[: options["batch_size"]]
+            )
+            if not histories:
+                break
+            for history in histories:
+                history.header_profile_id = HeaderProfile.get_profile_id(history.headers)
+                history.headers = None
+            ReceiveHistory.objects.bulk_update(histories, fields=["header_profile", "headers"])
+            last_id = histories[-1].id
+            compacted += len(histories)
+            self.stdout.write(f"compacted {compacted} histories, last id {last_id}")
+            if options["sleep"]:
+                time.sleep(options["sleep"])
+        self.stdout.write(f"done, compacted {compacted} histories")
@@ -0,0 +1,43 @@
+import time
+
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+
+from apps.vcd.fields import CONTENT_MARKER, ENCRYPTED_TAG
+from apps.vcd.models import VirtualContentItem
+
+
+class Command(BaseCommand):
+    """
+    Encrypt Stored Items
+    """
+
+    help = "encrypt items saved before VCD_ITEM_ENCRYPT_KEY was set in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--sleep", type=float, default=0, help="seconds to sleep between batches")
+
+    def handle(self, *args, **options):
+        if not settings.VCD_ITEM_ENCRYPT_KEY:
+            raise CommandError("VCD_ITEM_ENCRYPT_KEY is not set")
+        last_id = 0
+        encrypted = 0
+        while True:
+            # walk by id so every batch is an index range scan, the prefix is matched on stored values
+            items = list(
+                VirtualContentItem.objects.filter(id__gt=last_id)
+                .exclude(content__startswith=f"{CONTENT_MARKER}{ENCRYPTED_TAG}")
+                .order_by("id")
+                .only("id", "content")[: options["batch_size"]]
+            )
+            if not items:
+                break
+            # content is decoded on load and encrypted again on save
+            VirtualContentItem.objects.bulk_update(items, fields=["content"])
+            last_id = items[-1].id
+            encrypted += len(items)
+            self.stdout.write(f"encrypted {encrypted} items, last id {last_id}")
+            if options["sleep"]:
+                time.sleep(options["sleep"])
+        self.stdout.write(f"done, encrypted {encrypted} items")
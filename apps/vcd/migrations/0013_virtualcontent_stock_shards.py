@@ -0,0 +1,19 @@
+# pylint: disable=C0103,R0801
+# Generated by Django 4.2.30 on 2026-10-19 12:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("vcd", "0012_alter_virtualcontentitem_content"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="virtualcontent",
+            name="stock_shards",
+            field=models.PositiveSmallIntegerField(default=1, verbose_name="Stock Shards"),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# pylint: disable=C0103,R0801
+# Generated by Django 4.2.30 on 2026-10-19 12:48
+
+from django.db import migrations, models
+
+import apps.vcd.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("vcd", "0013_virtualcontent_stock_shards"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="virtualcontent",
+            name="deduplicate_items",
+            field=models.BooleanField(default=False, verbose_name="Deduplicate Items"),
+        ),
+        migrations.AddField(
+            model_name="virtualcontentitem",
+            name="content_hash",
+            field=models.CharField(blank=True, max_length=64, null=True, verbose_name="Content Hash"),
+        ),
+        migrations.AlterField(
+            model_name="virtualcontentitem",
+            name="content",
+            field=apps.vcd.fields.CompressedCharField(max_length=1024, verbose_name="Content"),
+        ),
+        migrations.AlterUniqueTogether(
+            name="virtualcontentitem",
+            unique_together={("virtual_content", "content_hash")},
+        ),
+    ]
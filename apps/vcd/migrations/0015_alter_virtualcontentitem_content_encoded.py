@@ -0,0 +1,21 @@
+# pylint: disable=C0103,R0801
+# Generated by Django 4.2.30 on 2026-10-19 12:49
+
+from django.db import migrations
+
+import apps.vcd.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("vcd", "0014_virtualcontentitem_content_hash"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="virtualcontentitem",
+            name="content",
+            field=apps.vcd.fields.EncodedTextField(verbose_name="Content"),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# pylint: disable=C0103,R0801
+# Generated by Django 4.2.30 on 2026-10-19 13:12
+
+import django.db.models.deletion
+import ovinc_client.core.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("vcd", "0015_alter_virtualcontentitem_content_encoded"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="HeaderProfile",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(primary_key=True, serialize=False, verbose_name="ID"),
+                ),
+                (
+                    "header_hash",
+                    models.CharField(max_length=64, unique=True, verbose_name="Header Hash"),
+                ),
+                ("headers", models.JSONField(verbose_name="Headers")),
+            ],
+            options={
+                "verbose_name": "Header Profile",
+                "verbose_name_plural": "Header Profile",
+                "ordering": ["-id"],
+            },
+        ),
+        migrations.AlterField(
+            model_name="receivehistory",
+            name="headers",
+            field=models.JSONField(blank=True, null=True, verbose_name="Headers"),
+        ),
+        migrations.AddField(
+            model_name="receivehistory",
+            name="header_profile",
+            field=ovinc_client.core.models.ForeignKey(
+                blank=True,
+                db_constraint=False,
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="receive_histories",
+                to="vcd.headerprofile",
+                verbose_name="Header Profile",
+            ),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# pylint: disable=C0103,R0801
+# Generated by Django 4.2.30 on 2026-10-19 13:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("vcd", "0016_receivehistory_header_profile"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="userreceivestats",
+            name="archived_count",
+            field=models.BigIntegerField(default=0, verbose_name="Archived Count"),
+        ),
+        migrations.AddField(
+            model_name="usersharestats",
+            name="archived_count",
+            field=models.BigIntegerField(default=0, verbose_name="Archived Count"),
+        ),
+        migrations.AddField(
+            model_name="virtualcontent",
+            name="archived_count",
+            field=models.BigIntegerField(default=0, verbose_name="Archived Count"),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# pylint: disable=C0103,R0801
+# Generated by Django 4.2.30 on 2026-10-19 13:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("vcd", "0017_archived_count"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="virtualcontent",
+            name="admission_enabled",
+            field=models.BooleanField(default=False, verbose_name="Admission Queue"),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# pylint: disable=C0103,R0801
+# Generated by Django 4.2.30 on 2026-10-19 13:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("vcd", "0018_virtualcontent_admission_enabled"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="virtualcontent",
+            name="distribution_mode",
+            field=models.CharField(
+                choices=[("fcfs", "First Come First Served"), ("lottery", "Lottery")],
+                default="fcfs",
+                max_length=32,
+                verbose_name="Distribution Mode",
+            ),
+        ),
+        migrations.AddField(
+            model_name="virtualcontent",
+            name="drawn_at",
+            field=models.DateTimeField(blank=True, null=True, verbose_name="Drawn Time"),
+        ),
+    ]
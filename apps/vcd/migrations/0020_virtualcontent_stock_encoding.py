@@ -0,0 +1,29 @@
+# pylint: disable=C0103,R0801
+# Generated by Django 4.2.30 on 2026-10-19 13:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("vcd", "0019_virtualcontent_distribution_mode"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="virtualcontent",
+            name="stock_base_id",
+            field=models.BigIntegerField(blank=True, null=True, verbose_name="Stock Base ID"),
+        ),
+        migrations.AddField(
+            model_name="virtualcontent",
+            name="stock_encoding",
+            field=models.CharField(
+                choices=[("list", "List"), ("bitmap", "Bitmap")],
+                default="list",
+                max_length=32,
+                verbose_name="Stock Encoding",
+            ),
+        ),
+    ]
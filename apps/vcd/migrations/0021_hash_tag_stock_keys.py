@@ -0,0 +1,28 @@
+# pylint: disable=C0103,R0801
+# Generated by Django 4.2.30 on 2026-10-19 15:20
+
+from django.db import migrations
+
+
+def hash_tag_stock_keys(*args, **kwargs):
+    # pylint: disable=C0415
+    from apps.core.utils import stock_cache
+    from apps.vcd.models import VirtualContent
+
+    # stock of single shard contents moves from the legacy keys to keys sharing one hash tag
+    client = stock_cache.client.get_client()
+    for virtual_content_id in VirtualContent.objects.filter(stock_shards__lte=1).values_list("id", flat=True):
+        for name in ["items", "pending"]:
+            legacy_key = f"virtual_content:{virtual_content_id}:{name}"
+            if client.exists(legacy_key):
+                client.rename(legacy_key, f"virtual_content:{{{virtual_content_id}}}:{name}")
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("vcd", "0020_virtualcontent_stock_encoding"),
+    ]
+
+    operations = [
+        migrations.RunPython(hash_tag_stock_keys, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,19 @@
-from functools import cached_property
-
+import datetime
+import hashlib
+import hmac
+import json
+import math
+import random
+import time
+import zlib
+from collections import Counter
+from functools import cached_property, lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
 from django.core.cache import cache
-from django.db import models
-from django.db.models import Index
+from django.db import models, transaction
+from django.db.models import F, Index, Max
 from django.utils import timezone
 from django.utils.translation import gettext_lazy
 from django_redis.cache import RedisCache
@@ -11,11 +22,30 @@ from ovinc_client.core.models import BaseModel, ForeignKey, UniqIDField
 from redis import Redis
 from redis.lock import Lock
 
+from apps.core.utils import get_script, stock_cache
+from apps.vcd.bitmaps import decode_offsets, encode_offsets
+from apps.vcd.constants import DistributionMode, StockEncoding
 from apps.vcd.exceptions import NoStock
+from apps.vcd.fields import EncodedTextField
+from apps.vcd.leases import take_leased_item
+from apps.vcd.scripts import (
+    ADMIT_SCRIPT,
+    CLAIM_BIT_SCRIPT,
+    CLAIM_ITEM_SCRIPT,
+    LEAVE_SCRIPT,
+    RELEASE_BIT_SCRIPT,
+    RELEASE_ITEM_SCRIPT,
+)
 
 cache: RedisCache
 
+HEADER_PROFILE_CACHE_SIZE = 4096
+REGISTRANTS_KEEP_DAYS = 1
+STOCK_DRIFT_KEY = "virtual_content:stock_drift"
+STOCK_DRIFT_TIMEOUT = 60 * 15
+
 
+# pylint: disable=R0904
 class VirtualContent(BaseModel):
     """
     Virtual Content
@@ -28,7 +58,26 @@ class VirtualContent(BaseModel):
     allowed_users = models.JSONField(gettext_lazy("Allowed Users"), default=list, blank=True)
     allow_same_ip = models.BooleanField(gettext_lazy("Allow Same IP"), default=True)
     items_count = models.BigIntegerField(gettext_lazy("Total Items"), default=0)
+    archived_count = models.BigIntegerField(gettext_lazy("Archived Count"), default=0)
     show_receiver = models.BooleanField(gettext_lazy("Show Receiver"), default=False)
+    stock_shards = models.PositiveSmallIntegerField(gettext_lazy("Stock Shards"), default=1)
+    deduplicate_items = models.BooleanField(gettext_lazy("Deduplicate Items"), default=False)
+    stock_encoding = models.CharField(
+        gettext_lazy("Stock Encoding"),
+        max_length=SHORT_CHAR_LENGTH,
+        choices=StockEncoding.choices,
+        default=StockEncoding.LIST,
+    )
+    # bitmap offsets count from the first item
+    stock_base_id = models.BigIntegerField(gettext_lazy("Stock Base ID"), null=True, blank=True)
+    admission_enabled = models.BooleanField(gettext_lazy("Admission Queue"), default=False)
+    distribution_mode = models.CharField(
+        gettext_lazy("Distribution Mode"),
+        max_length=SHORT_CHAR_LENGTH,
+        choices=DistributionMode.choices,
+        default=DistributionMode.FCFS,
+    )
+    drawn_at = models.DateTimeField(gettext_lazy("Drawn Time"), null=True, blank=True)
     start_time = models.DateTimeField(gettext_lazy("Start Time"))
     end_time = models.DateTimeField(gettext_lazy("End Time"), db_index=True)
     created_by = ForeignKey(
@@ -61,9 +110,52 @@ class VirtualContent(BaseModel):
             nx=True,
         )
 
+    def get_shard_key(self, shard: int, name: str) -> str:
+        # items and pending of one shard share a hash tag, so claim scripts stay in one cluster slot
+        if self.stock_shards <= 1:
+            return f"virtual_content:{{{self.id}}}:{name}"
+        return f"virtual_content:{{{self.id}:{shard}}}:{name}"
+
+    def get_items_key(self, shard: int) -> str:
+        return self.get_shard_key(shard, "items")
+
+    def get_pending_key(self, shard: int) -> str:
+        return self.get_shard_key(shard, "pending")
+
     @property
-    def items_key(self) -> str:
-        return f"virtual_content:{self.id}:items"
+    def items_keys(self) -> List[str]:
+        return [self.get_items_key(shard) for shard in range(max(self.stock_shards, 1))]
+
+    @property
+    def pending_keys(self) -> List[str]:
+        return [self.get_pending_key(shard) for shard in range(max(self.stock_shards, 1))]
+
+    def get_item_shard(self, item_id: int) -> int:
+        return int(item_id) % max(self.stock_shards, 1)
+
+    @property
+    def is_bitmap_stock(self) -> bool:
+        return self.stock_encoding == StockEncoding.BITMAP
+
+    @property
+    def stock_base_offset(self) -> int:
+        return (self.stock_base_id or 0) // max(self.stock_shards, 1)
+
+    def get_item_offset(self, item_id: int) -> int:
+        # ids in one shard step by the shard count, so offsets stay dense
+        return int(item_id) // max(self.stock_shards, 1) - self.stock_base_offset
+
+    def get_offset_item(self, shard: int, offset: int) -> int:
+        return (offset + self.stock_base_offset) * max(self.stock_shards, 1) + shard
+
+    def count_listed(self, pipeline, shard: int) -> None:
+        if self.is_bitmap_stock:
+            pipeline.bitcount(self.get_items_key(shard))
+        else:
+            pipeline.llen(self.get_items_key(shard))
+
+    def get_user_shard(self, username: str) -> int:
+        return zlib.crc32(username.encode()) % max(self.stock_shards, 1)
 
     @property
     def lock_key(self) -> str:
@@ -71,33 +163,345 @@ class VirtualContent(BaseModel):
 
     @cached_property
     def lock(self) -> Lock:
-        return Lock(redis=cache.client.get_client(), name=self.lock_key, blocking=True)
+        return Lock(redis=stock_cache.client.get_client(), name=self.lock_key, blocking=True)
+
+    @classmethod
+    def get_admission_keys(cls, virtual_content_id: str) -> List[str]:
+        # both keys share a hash tag, scripts touch them together
+        return [
+            f"virtual_content:{{{virtual_content_id}}}:admission",
+            f"virtual_content:{{{virtual_content_id}}}:admitted",
+        ]
+
+    @classmethod
+    def check_admission(cls, virtual_content_id: str, username: str) -> Optional[bool]:
+        """
+        take a ticket without loading the content, None when the queue is not open
+        """
+
+        result = get_script(ADMIT_SCRIPT, "stock")(keys=cls.get_admission_keys(virtual_content_id), args=[username])
+        return None if result < 0 else bool(result)
+
+    @classmethod
+    def leave_admission(cls, virtual_content_id: str, username: str) -> bool:
+        """
+        give the ticket back when the user leaves without an item
+        """
+
+        return bool(get_script(LEAVE_SCRIPT, "stock")(keys=cls.get_admission_keys(virtual_content_id), args=[username]))
+
+    def open_admission(self) -> None:
+        """
+        admit about as many users as the remaining stock, plus slack for those leaving early
+        """
+
+        stock = self.get_stock()
+        slack = max(math.ceil(stock * settings.VCD_ADMISSION_SLACK_RATIO), settings.VCD_ADMISSION_MIN_SLACK)
+        admission_key, _ = self.get_admission_keys(self.id)
+        pipeline = stock_cache.client.get_client().pipeline(transaction=True)
+        pipeline.hsetnx(admission_key, "limit", stock + slack)
+        # pylint: disable=E1101
+        pipeline.hset(admission_key, "expire_at", int(self.end_time.timestamp()))
+        pipeline.expireat(admission_key, self.end_time)
+        pipeline.execute()
+
+    def close_admission(self) -> None:
+        stock_cache.client.get_client().delete(*self.get_admission_keys(self.id))
+
+    def admit(self, username: str) -> bool:
+        result = self.check_admission(self.id, username)
+        if result is None:
+            self.open_admission()
+            result = self.check_admission(self.id, username)
+        return bool(result)
+
+    def get_stock(self) -> int:
+        """
+        items listed or reserved in redis
+        """
+
+        pipeline = stock_cache.client.get_client().pipeline(transaction=False)
+        self.count_stock(pipeline)
+        return sum(pipeline.execute())
+
+    def count_stock(self, pipeline) -> None:
+        # listed count of each shard, then reserved count of each shard
+        for shard in range(max(self.stock_shards, 1)):
+            self.count_listed(pipeline, shard)
+        for pending_key in self.pending_keys:
+            pipeline.zcard(pending_key)
+
+    @classmethod
+    def get_stock_drifts(cls) -> Dict[str, int]:
+        """
+        drift of each content found by the last reconcile
+        """
+
+        drifts = stock_cache.client.get_client().hgetall(STOCK_DRIFT_KEY)
+        return {virtual_content_id.decode(): int(drift) for virtual_content_id, drift in drifts.items()}
+
+    @classmethod
+    def set_stock_drifts(cls, drifts: Dict[str, int]) -> None:
+        pipeline = stock_cache.client.get_client().pipeline(transaction=True)
+        pipeline.delete(STOCK_DRIFT_KEY)
+        if drifts:
+            pipeline.hset(STOCK_DRIFT_KEY, mapping=drifts)
+            pipeline.expire(STOCK_DRIFT_KEY, STOCK_DRIFT_TIMEOUT)
+        pipeline.execute()
+
+    @property
+    def registrants_key(self) -> str:
+        return f"virtual_content:{self.id}:registrants"
+
+    def register(self, username: str, client_ip: str, header_profile_id: int) -> bool:
+        """
+        join the lottery, keeping what the draw needs to write the history
+        """
+
+        pipeline = stock_cache.client.get_client().pipeline(transaction=True)
+        pipeline.hsetnx(
+            self.registrants_key,
+            username,
+            json.dumps({"client_ip": client_ip, "header_profile_id": header_profile_id}),
+        )
+        # keep registrants until a late draw picks them up
+        pipeline.expireat(self.registrants_key, self.end_time + datetime.timedelta(days=REGISTRANTS_KEEP_DAYS))
+        return bool(pipeline.execute()[0])
+
+    def is_registered(self, username: str) -> bool:
+        return bool(stock_cache.client.get_client().hexists(self.registrants_key, username))
+
+    def draw(self) -> List["ReceiveHistory"]:
+        """
+        pick winners among registrants at random and give each of them one item in bulk
+        """
+
+        client: Redis = stock_cache.client.get_client()
+        registrants = {
+            username.decode(): json.loads(registrant)
+            for username, registrant in client.hgetall(self.registrants_key).items()
+        }
+        self.lock.acquire()
+        try:
+            with transaction.atomic():
+                # mark as drawn first, a concurrent draw updates nothing and stops here
+                if not VirtualContent.objects.filter(id=self.id, drawn_at__isnull=True).update(drawn_at=timezone.now()):
+                    return []
+                # pylint: disable=E1101
+                received = set(self.receive_histories.values_list("receiver_id", flat=True))
+                item_ids = list(
+                    self.items.exclude(id__in=self.receive_histories.values("virtual_content_item_id"))
+                    .order_by("id")
+                    .values_list("id", flat=True)
+                )
+                candidates = sorted(set(registrants.keys()) - received)
+                winners = random.SystemRandom().sample(candidates, min(len(candidates), len(item_ids)))
+                histories = ReceiveHistory.objects.bulk_create(
+                    [
+                        ReceiveHistory(
+                            virtual_content=self,
+                            virtual_content_item_id=item_id,
+                            receiver_id=username,
+                            client_ip=registrants[username]["client_ip"],
+                            header_profile_id=registrants[username]["header_profile_id"],
+                        )
+                        for username, item_id in zip(winners, item_ids)
+                    ]
+                )
+        finally:
+            self.lock.release()
+        # content is closed, leftovers stay in db only, registrants expire by themselves
+        self.clear_stock()
+        return histories
+
+    def clear_stock(self) -> None:
+        # shards hash to different cluster slots, one key per DEL avoids cross slot errors
+        pipeline = stock_cache.client.get_client().pipeline(transaction=False)
+        for key in [*self.items_keys, *self.pending_keys]:
+            pipeline.delete(key)
+        pipeline.execute()
 
     def reload_items(self) -> None:
         self.lock.acquire()
         try:
-            client: Redis = cache.client.get_client()
-            client.delete(self.items_key)
+            self.clear_stock()
+            client: Redis = stock_cache.client.get_client()
             # pylint: disable=E1101
             items = list(
                 self.items.exclude(id__in=self.receive_histories.values("virtual_content_item_id")).values_list(
                     "id", flat=True
                 )
             )
-            self.push_items(*items)
+            if not self.is_bitmap_stock:
+                self.push_items(*items)
+                return
+            # one write per shard
+            shards = {}
+            for item_id in items:
+                shards.setdefault(self.get_item_shard(item_id), []).append(self.get_item_offset(item_id))
+            pipeline = client.pipeline(transaction=False)
+            for shard, offsets in shards.items():
+                pipeline.setrange(self.get_items_key(shard), 0, encode_offsets(offsets))
+            pipeline.execute()
         finally:
             self.lock.release()
 
     def push_items(self, *args) -> None:
         if len(args) <= 0:
             return
-        cache.client.get_client().rpush(self.items_key, *args)
-
-    def get_one_item(self) -> "VirtualContentItem":
-        item_id = cache.client.get_client().lpop(name=self.items_key)
-        if not item_id:
-            raise NoStock()
-        return VirtualContentItem.objects.get(id=item_id)
+        # each item always lives in the shard of its id
+        shards = {}
+        for item_id in args:
+            shards.setdefault(self.get_item_shard(item_id), []).append(item_id)
+        pipeline = stock_cache.client.get_client().pipeline(transaction=False)
+        for shard, item_ids in shards.items():
+            if not self.is_bitmap_stock:
+                pipeline.rpush(self.get_items_key(shard), *item_ids)
+                continue
+            for item_id in item_ids:
+                pipeline.setbit(self.get_items_key(shard), self.get_item_offset(item_id), 1)
+        pipeline.execute()
+
+    def import_items(self, contents: List[str]) -> List[int]:
+        """
+        insert items in one set-based pass and push them to stock
+        """
+
+        # drop duplicates, including those already stored
+        if self.deduplicate_items:
+            contents = {VirtualContentItem.hash_content(content): content for content in contents}
+            # pylint: disable=E1101
+            exists = set(self.items.filter(content_hash__in=contents.keys()).values_list("content_hash", flat=True))
+            items = [
+                VirtualContentItem(virtual_content=self, content=content, content_hash=content_hash)
+                for content_hash, content in contents.items()
+                if content_hash not in exists
+            ]
+        else:
+            items = [VirtualContentItem(virtual_content=self, content=content) for content in contents]
+        if not items:
+            return []
+        # save to db
+        # pylint: disable=E1101
+        last_id = self.items.aggregate(last_id=Max("id"))["last_id"] or 0
+        VirtualContentItem.objects.bulk_create(objs=items)
+        item_ids = list(self.items.filter(id__gt=last_id).values_list("id", flat=True))
+        VirtualContent.objects.filter(id=self.id).update(items_count=F("items_count") + len(item_ids))
+        # later items always have larger ids, the first import fixes the base
+        if self.stock_base_id is None:
+            self.stock_base_id = min(item_ids)
+            VirtualContent.objects.filter(id=self.id).update(stock_base_id=self.stock_base_id)
+        # push to stock
+        self.push_items(*item_ids)
+        # let in as many more users as the new items
+        admission_key, _ = self.get_admission_keys(self.id)
+        client: Redis = stock_cache.client.get_client()
+        if client.hexists(admission_key, "limit"):
+            client.hincrby(admission_key, "limit", len(item_ids))
+        return item_ids
+
+    def repair_items(self) -> Tuple[int, int]:
+        """
+        push missing items and remove stale ones without rebuilding the whole stock
+        """
+
+        client: Redis = stock_cache.client.get_client()
+        # snapshot each shard atomically, items never move across shards
+        listed = Counter()
+        pending = set()
+        for shard in range(max(self.stock_shards, 1)):
+            pipeline = client.pipeline(transaction=True)
+            if self.is_bitmap_stock:
+                pipeline.get(self.get_items_key(shard))
+            else:
+                pipeline.lrange(self.get_items_key(shard), 0, -1)
+            pipeline.zrange(self.get_pending_key(shard), 0, -1)
+            shard_listed, shard_pending = pipeline.execute()
+            if self.is_bitmap_stock:
+                shard_listed = [self.get_offset_item(shard, offset) for offset in decode_offsets(shard_listed)]
+            listed.update(int(item_id) for item_id in shard_listed)
+            pending.update(int(item_id) for item_id in shard_pending)
+        # load unreceived items
+        # pylint: disable=E1101
+        unreceived = set(self.items.values_list("id", flat=True)) - set(
+            self.receive_histories.values_list("virtual_content_item_id", flat=True)
+        )
+        # push missing items
+        missing = unreceived - set(listed.keys()) - pending
+        self.push_items(*sorted(missing))
+        # remove received or duplicated items
+        pipeline = client.pipeline(transaction=False)
+        removed = 0
+        for item_id, count in listed.items():
+            count = count if item_id not in unreceived else count - 1
+            if count <= 0:
+                continue
+            if self.is_bitmap_stock:
+                pipeline.setbit(self.get_items_key(self.get_item_shard(item_id)), self.get_item_offset(item_id), 0)
+            else:
+                pipeline.lrem(self.get_items_key(self.get_item_shard(item_id)), count, item_id)
+            removed += count
+        pipeline.execute()
+        return len(missing), removed
+
+    def get_one_item(self, username: str) -> "VirtualContentItem":
+        """
+        reserve one item, the reservation should be confirmed or released later
+        """
+
+        # start from the shard of user, fall back to other shards when it runs dry
+        script = get_script(CLAIM_BIT_SCRIPT if self.is_bitmap_stock else CLAIM_ITEM_SCRIPT, "stock")
+        deadline = time.time() + settings.VCD_RESERVATION_TIMEOUT
+        shards = max(self.stock_shards, 1)
+        start = self.get_user_shard(username)
+        for offset in range(shards):
+            shard = (start + offset) % shards
+            if settings.VCD_LEASE_SIZE > 1:
+                item_id = take_leased_item(self, shard)
+            else:
+                args = [deadline, self.stock_base_offset, shards, shard] if self.is_bitmap_stock else [deadline]
+                item_id = script(keys=[self.get_items_key(shard), self.get_pending_key(shard)], args=args)
+            if item_id:
+                # content is not needed for receiving, skip loading and decoding it
+                return VirtualContentItem.objects.defer("content").get(id=item_id)
+        raise NoStock()
+
+    def confirm_item(self, item_id: int) -> None:
+        stock_cache.client.get_client().zrem(self.get_pending_key(self.get_item_shard(item_id)), item_id)
+
+    def release_item(self, item_id: int) -> bool:
+        shard = self.get_item_shard(item_id)
+        keys = [self.get_items_key(shard), self.get_pending_key(shard)]
+        if self.is_bitmap_stock:
+            return bool(
+                get_script(RELEASE_BIT_SCRIPT, "stock")(keys=keys, args=[item_id, self.get_item_offset(item_id)])
+            )
+        return bool(get_script(RELEASE_ITEM_SCRIPT, "stock")(keys=keys, args=[item_id]))
+
+    def reap_reservations(self) -> Tuple[int, int]:
+        """
+        return expired reservations to stock, drop those already received
+        """
+
+        client: Redis = stock_cache.client.get_client()
+        pipeline = client.pipeline(transaction=False)
+        for pending_key in self.pending_keys:
+            pipeline.zrangebyscore(pending_key, "-inf", time.time())
+        item_ids = [int(item_id) for item_ids in pipeline.execute() for item_id in item_ids]
+        if not item_ids:
+            return 0, 0
+        received = set(
+            ReceiveHistory.objects.filter(virtual_content_item_id__in=item_ids).values_list(
+                "virtual_content_item_id", flat=True
+            )
+        )
+        returned = 0
+        for item_id in item_ids:
+            if item_id in received:
+                self.confirm_item(item_id)
+                continue
+            returned += int(self.release_item(item_id))
+        return returned, len(received)
 
 
 class VirtualContentItem(BaseModel):
@@ -109,7 +513,8 @@ class VirtualContentItem(BaseModel):
     virtual_content = ForeignKey(
         gettext_lazy("Virtual Content"), to="VirtualContent", on_delete=models.CASCADE, related_name="items"
     )
-    content = models.CharField(gettext_lazy("Content"), max_length=1024)
+    content = EncodedTextField(gettext_lazy("Content"))
+    content_hash = models.CharField(gettext_lazy("Content Hash"), max_length=64, null=True, blank=True)
 
     class Meta:
         verbose_name = gettext_lazy("Virtual Content Item")
@@ -118,10 +523,59 @@ class VirtualContentItem(BaseModel):
         indexes = [
             Index(fields=["virtual_content", "id"]),
         ]
+        unique_together = [
+            ["virtual_content", "content_hash"],
+        ]
 
     def __str__(self) -> str:
         return f"{self.virtual_content}:{self.id}"
 
+    @classmethod
+    def hash_content(cls, content: str) -> str:
+        # keyed hash keeps encrypted contents from being guessed by their hashes
+        if settings.VCD_ITEM_ENCRYPT_KEY:
+            return hmac.new(settings.VCD_ITEM_ENCRYPT_KEY.encode(), content.encode(), hashlib.sha256).hexdigest()
+        return hashlib.sha256(content.encode()).hexdigest()
+
+
+class HeaderProfile(BaseModel):
+    """
+    Header Profile, shared by receive histories with the same kept headers
+    """
+
+    id = models.BigAutoField(gettext_lazy("ID"), primary_key=True)
+    header_hash = models.CharField(gettext_lazy("Header Hash"), max_length=64, unique=True)
+    headers = models.JSONField(gettext_lazy("Headers"))
+
+    class Meta:
+        verbose_name = gettext_lazy("Header Profile")
+        verbose_name_plural = verbose_name
+        ordering = ["-id"]
+
+    def __str__(self) -> str:
+        return f"{self.id}:{self.header_hash}"
+
+    @classmethod
+    def normalize(cls, headers: dict) -> dict:
+        # keep allowed headers only, whatever their case
+        allowlist = {name.lower(): name for name in settings.VCD_HEADER_ALLOWLIST}
+        return {
+            allowlist[name.lower()]: str(value).strip()
+            for name, value in headers.items()
+            if name.lower() in allowlist and value
+        }
+
+    @classmethod
+    def get_profile_id(cls, headers: dict) -> int:
+        content = json.dumps(cls.normalize(headers), ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+        return get_header_profile_id(hashlib.sha256(content.encode()).hexdigest(), content)
+
+
+@lru_cache(maxsize=HEADER_PROFILE_CACHE_SIZE)
+def get_header_profile_id(header_hash: str, content: str) -> int:
+    profile, _ = HeaderProfile.objects.get_or_create(header_hash=header_hash, defaults={"headers": json.loads(content)})
+    return profile.id
+
 
 class ReceiveHistory(BaseModel):
     """
@@ -144,7 +598,16 @@ class ReceiveHistory(BaseModel):
     )
     received_at = models.DateTimeField(gettext_lazy("Received Time"), auto_now_add=True, db_index=True)
     client_ip = models.GenericIPAddressField(gettext_lazy("Client IP"))
-    headers = models.JSONField(gettext_lazy("Headers"))
+    header_profile = ForeignKey(
+        gettext_lazy("Header Profile"),
+        to="HeaderProfile",
+        on_delete=models.PROTECT,
+        related_name="receive_histories",
+        null=True,
+        blank=True,
+    )
+    # legacy full headers, moved into header profiles by compact_receive_headers
+    headers = models.JSONField(gettext_lazy("Headers"), null=True, blank=True)
 
     class Meta:
         verbose_name = gettext_lazy("Receive History")
@@ -175,6 +638,8 @@ class UserReceiveStats(BaseModel):
         db_constraint=False,
     )
     count = models.BigIntegerField(gettext_lazy("Count"), db_index=True)
+    # receives moved out by archival, still counted in count
+    archived_count = models.BigIntegerField(gettext_lazy("Archived Count"), default=0)
 
     class Meta:
         verbose_name = gettext_lazy("User Receive Stats")
@@ -199,6 +664,8 @@ class UserShareStats(BaseModel):
         db_constraint=False,
     )
     count = models.BigIntegerField(gettext_lazy("Count"), db_index=True)
+    # receives moved out by archival, still counted in count
+    archived_count = models.BigIntegerField(gettext_lazy("Archived Count"), default=0)
 
     class Meta:
         verbose_name = gettext_lazy("User Share Stats")
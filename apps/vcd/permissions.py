@@ -1,20 +1,29 @@
 from rest_framework.permissions import BasePermission
 
-from apps.vcd.exceptions import TrustLevelNotMatch, UserNotInWhitelist
+from apps.oauth.models import ProfileSnapshot
+from apps.vcd.exceptions import (
+    AdmissionRejected,
+    TrustLevelNotMatch,
+    UserNotInWhitelist,
+)
 from apps.vcd.models import ReceiveHistory, VirtualContent
 
 
 class VirtualContentPermission(BasePermission):
     def has_permission(self, request, view):
+        # turn away users behind the queue before captcha, db and throttles
+        if view.action in ["receive"]:
+            if VirtualContent.check_admission(view.kwargs["pk"], request.user.username) is False:
+                raise AdmissionRejected()
         return True
 
     def has_object_permission(self, request, view, obj: VirtualContent):
-        if view.action in ["retrieve", "receive_history"]:
+        if view.action in ["retrieve", "receive_history", "registration"]:
             return True
-        if view.action in ["receive"]:
+        if view.action in ["receive", "register"]:
             if obj.allowed_users and request.user.username not in obj.allowed_users:
                 raise UserNotInWhitelist()
-            if request.user.profile.trust_level not in obj.allowed_trust_levels:
+            if ProfileSnapshot.load(request.user.username).trust_level not in obj.allowed_trust_levels:
                 raise TrustLevelNotMatch()
             return True
         return obj.created_by == request.user
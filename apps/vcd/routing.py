@@ -0,0 +1,7 @@
+from django.urls import path
+
+from apps.vcd.consumers import VirtualContentConsumer
+
+websocket_urlpatterns = [
+    path("ws/virtual_content/<str:pk>/", VirtualContentConsumer.as_asgi()),
+]
@@ -0,0 +1,102 @@
+# KEYS: items, pending; ARGV: deadline
+CLAIM_ITEM_SCRIPT = """
+local item_id = redis.call("LPOP", KEYS[1])
+if not item_id then
+    return false
+end
+redis.call("ZADD", KEYS[2], ARGV[1], item_id)
+return item_id
+"""
+
+# KEYS: items, pending; ARGV: item id
+RELEASE_ITEM_SCRIPT = """
+if redis.call("ZREM", KEYS[2], ARGV[1]) == 0 then
+    return 0
+end
+redis.call("RPUSH", KEYS[1], ARGV[1])
+return 1
+"""
+
+# KEYS: items bitmap, pending; ARGV: deadline, base offset, shards, shard
+CLAIM_BIT_SCRIPT = """
+local offset = redis.call("BITPOS", KEYS[1], 1)
+if offset < 0 then
+    return false
+end
+redis.call("SETBIT", KEYS[1], offset, 0)
+local item_id = string.format("%d", (offset + tonumber(ARGV[2])) * tonumber(ARGV[3]) + tonumber(ARGV[4]))
+redis.call("ZADD", KEYS[2], ARGV[1], item_id)
+return item_id
+"""
+
+# KEYS: items bitmap, pending; ARGV: item id, offset
+RELEASE_BIT_SCRIPT = """
+if redis.call("ZREM", KEYS[2], ARGV[1]) == 0 then
+    return 0
+end
+redis.call("SETBIT", KEYS[1], ARGV[2], 1)
+return 1
+"""
+
+# KEYS: items, pending; ARGV: deadline, count, min stock
+LEASE_ITEMS_SCRIPT = """
+local count = tonumber(ARGV[2])
+if redis.call("LLEN", KEYS[1]) < tonumber(ARGV[3]) then
+    count = 1
+end
+local item_ids = redis.call("LPOP", KEYS[1], count)
+if not item_ids then
+    return {}
+end
+for _, item_id in ipairs(item_ids) do
+    redis.call("ZADD", KEYS[2], ARGV[1], item_id)
+end
+return item_ids
+"""
+
+# KEYS: items bitmap, pending; ARGV: deadline, count, min stock, base offset, shards, shard
+LEASE_BITS_SCRIPT = """
+local count = tonumber(ARGV[2])
+if redis.call("BITCOUNT", KEYS[1]) < tonumber(ARGV[3]) then
+    count = 1
+end
+local item_ids = {}
+for _ = 1, count do
+    local offset = redis.call("BITPOS", KEYS[1], 1)
+    if offset < 0 then
+        break
+    end
+    redis.call("SETBIT", KEYS[1], offset, 0)
+    local item_id = string.format("%d", (offset + tonumber(ARGV[4])) * tonumber(ARGV[5]) + tonumber(ARGV[6]))
+    redis.call("ZADD", KEYS[2], ARGV[1], item_id)
+    table.insert(item_ids, item_id)
+end
+return item_ids
+"""
+
+# KEYS: admission, admitted; ARGV: username
+ADMIT_SCRIPT = """
+if redis.call("HEXISTS", KEYS[2], ARGV[1]) == 1 then
+    return 1
+end
+local limit = redis.call("HGET", KEYS[1], "limit")
+if not limit then
+    return -1
+end
+if tonumber(redis.call("HGET", KEYS[1], "admitted") or "0") >= tonumber(limit) then
+    return 0
+end
+local ticket = redis.call("HINCRBY", KEYS[1], "admitted", 1)
+redis.call("HSET", KEYS[2], ARGV[1], ticket)
+redis.call("EXPIREAT", KEYS[2], redis.call("HGET", KEYS[1], "expire_at"))
+return 1
+"""
+
+# KEYS: admission, admitted; ARGV: username
+LEAVE_SCRIPT = """
+if redis.call("HDEL", KEYS[2], ARGV[1]) == 0 then
+    return 0
+end
+redis.call("HINCRBY", KEYS[1], "admitted", -1)
+return 1
+"""
@@ -1,4 +1,5 @@
 import datetime
+from typing import List
 
 from django.db import transaction
 from django.db.models import F
@@ -8,10 +9,12 @@ from ovinc_client.core.constants import MAX_CHAR_LENGTH
 from rest_framework import serializers
 
 from apps.oauth.constants import TrustLevelChoices
-from apps.vcd.models import ReceiveHistory, VirtualContent, VirtualContentItem
+from apps.vcd.constants import ExportFileType
+from apps.vcd.models import ReceiveHistory, VirtualContent
 
 MAX_ITEMS_OF_VC = 10000
 MAX_USER_WHITELIST = 10000
+MAX_STOCK_SHARDS = 64
 
 
 class VCSerializer(serializers.ModelSerializer):
@@ -46,6 +49,9 @@ class CreateVCSerializer(serializers.ModelSerializer):
         min_length=0,
         max_length=MAX_USER_WHITELIST,
     )
+    stock_shards = serializers.IntegerField(
+        label=gettext_lazy("Stock Shards"), required=False, default=1, min_value=1, max_value=MAX_STOCK_SHARDS
+    )
 
     class Meta:
         model = VirtualContent
@@ -57,6 +63,11 @@ class CreateVCSerializer(serializers.ModelSerializer):
             "allowed_users",
             "allow_same_ip",
             "show_receiver",
+            "stock_shards",
+            "deduplicate_items",
+            "stock_encoding",
+            "admission_enabled",
+            "distribution_mode",
             "start_time",
             "end_time",
         ]
@@ -64,11 +75,8 @@ class CreateVCSerializer(serializers.ModelSerializer):
     @transaction.atomic
     def save(self, **kwargs):
         items = self.validated_data.pop("items")
-        inst = super().save(**kwargs, items_count=len(items))
-        VirtualContentItem.objects.bulk_create(
-            objs=[VirtualContentItem(virtual_content=inst, content=item) for item in items],
-        )
-        inst.push_items(*list(inst.items.all().values_list("id", flat=True)))
+        inst = super().save(**kwargs)
+        inst.import_items(items)
         return inst
 
     def validate_end_time(self, end_time: datetime.datetime) -> datetime.datetime:
@@ -112,6 +120,7 @@ class UpdateVCSerializer(serializers.ModelSerializer):
             "allowed_users",
             "allow_same_ip",
             "show_receiver",
+            "admission_enabled",
             "start_time",
             "end_time",
         ]
@@ -119,12 +128,9 @@ class UpdateVCSerializer(serializers.ModelSerializer):
     @transaction.atomic
     def save(self, **kwargs):
         items = self.validated_data.pop("extra_items", [])
-        inst = super().save(**kwargs, items_count=F("items_count") + len(items))
-        if items:
-            results = []
-            for item in items:
-                results.append(VirtualContentItem.objects.create(virtual_content=inst, content=item))
-            inst.push_items(*[result.id for result in results])
+        # saving the row first holds its lock, which serializes concurrent imports
+        inst = super().save(**kwargs, items_count=F("items_count"))
+        inst.import_items(items)
         return inst
 
     def validate_end_time(self, end_time: datetime.datetime) -> datetime.datetime:
@@ -133,35 +139,48 @@ class UpdateVCSerializer(serializers.ModelSerializer):
         return end_time
 
 
-class ReceiveHistoryUserSerializer(serializers.ModelSerializer):
-    virtual_content_name = serializers.CharField(source="virtual_content.name")
-    virtual_content_item_content = serializers.CharField(source="virtual_content_item.content")
-
-    class Meta:
-        model = ReceiveHistory
-        fields = ["id", "received_at", "virtual_content", "virtual_content_name", "virtual_content_item_content"]
-
+class ExportReceiveHistorySerializer(serializers.Serializer):
+    file_type = serializers.ChoiceField(
+        label=gettext_lazy("File Type"), choices=ExportFileType.choices, default=ExportFileType.CSV
+    )
 
-class ReceiveHistoryPublicSerializer(serializers.ModelSerializer):
-    receiver__nickname = serializers.CharField(source="receiver.nick_name")
-    receiver_trust_level = serializers.IntegerField(source="receiver.profile.trust_level")
 
-    class Meta:
-        model = ReceiveHistory
-        fields = ["id", "receiver", "received_at", "receiver__nickname", "receiver_trust_level"]
+class LotteryRegistrationSerializer(serializers.Serializer):
+    registered = serializers.BooleanField(label=gettext_lazy("Registered"))
+    drawn_at = serializers.DateTimeField(label=gettext_lazy("Drawn Time"), allow_null=True)
+    receive_history = serializers.IntegerField(label=gettext_lazy("Receive History"), allow_null=True)
 
 
-class ReceiveHistoryHideUserInfoSerializer(serializers.ModelSerializer):
-    receiver = serializers.SerializerMethodField()
-    receiver__nickname = serializers.SerializerMethodField()
-    receiver_trust_level = serializers.IntegerField(source="receiver.profile.trust_level")
+class ReceiveHistoryUserSerializer(serializers.ModelSerializer):
+    virtual_content_name = serializers.CharField(source="virtual_content.name")
+    virtual_content_item_content = serializers.CharField(source="virtual_content_item.content")
 
     class Meta:
         model = ReceiveHistory
-        fields = ["id", "receiver", "received_at", "receiver__nickname", "receiver_trust_level"]
+        fields = ["id", "received_at", "virtual_content", "virtual_content_name", "virtual_content_item_content"]
 
-    def get_receiver__nickname(self, _: ReceiveHistory):
-        return ""
 
-    def get_receiver(self, _: ReceiveHistory):
-        return "******"
+class ReceiveHistoryPageSerializer:
+    """
+    Serialize rows of values(*fields) into plain dicts, skipping drf field machinery
+    """
+
+    fields = ["id", "receiver_id", "received_at", "receiver__nick_name", "receiver__profile__trust_level"]
+    received_at_field = serializers.DateTimeField()
+
+    def __init__(self, instance: List[dict], hide_user_info: bool = False):
+        self.instance = instance
+        self.hide_user_info = hide_user_info
+
+    @property
+    def data(self) -> List[dict]:
+        return [
+            {
+                "id": row["id"],
+                "receiver": "******" if self.hide_user_info else row["receiver_id"],
+                "received_at": self.received_at_field.to_representation(row["received_at"]),
+                "receiver__nickname": "" if self.hide_user_info else row["receiver__nick_name"],
+                "receiver_trust_level": row["receiver__profile__trust_level"],
+            }
+            for row in self.instance
+        ]
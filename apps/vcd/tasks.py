@@ -1,18 +1,33 @@
-from typing import List
+import datetime
+from collections import Counter
+from typing import Dict, List, Type, Union
 
+from django.conf import settings
+from django.core.cache import cache
 from django.db import transaction
-from django.db.models import Count
+from django.db.models import Count, F, Q
 from django.utils import timezone
 from ovinc_client.core.lock import task_lock
 from ovinc_client.core.logger import celery_logger
 
 from apps.cel import app
+from apps.core.archive import archive_queryset
+from apps.core.routers import use_replica
+from apps.core.utils import stock_cache
+from apps.oauth.models import ProfileSnapshot
+from apps.vcd.broadcasts import get_broadcast_interval, get_broadcast_keys, send_stock
+from apps.vcd.constants import DistributionMode
 from apps.vcd.models import (
     ReceiveHistory,
     UserReceiveStats,
     UserShareStats,
     VirtualContent,
 )
+from apps.vcd.serializers import VCSerializer
+from apps.vcd.views import VirtualContentViewSet
+
+# seconds between two runs of schedule_prewarm and schedule_stock_pushes
+PREWARM_SCAN_INTERVAL = 60
 
 
 @app.task(bind=True)
@@ -21,7 +36,8 @@ def do_stats(self):
     celery_logger.info("[DoStats] Start %s", self.request.id)
 
     # query db
-    receiver_counts = ReceiveHistory.objects.values("receiver_id").annotate(count=Count("*"))
+    with use_replica():
+        receiver_counts = list(ReceiveHistory.objects.values("receiver_id").annotate(count=Count("*")))
 
     # save to db
     for receiver_count in receiver_counts:
@@ -35,11 +51,12 @@ def do_stats(self):
                 receiver_count["count"],
             )
             continue
-        stats.count = receiver_count["count"]
+        stats.count = receiver_count["count"] + stats.archived_count
         stats.save(update_fields=["count"])
 
     # query db
-    share_counts = ReceiveHistory.objects.values("virtual_content__created_by").annotate(count=Count("*"))
+    with use_replica():
+        share_counts = list(ReceiveHistory.objects.values("virtual_content__created_by").annotate(count=Count("*")))
 
     # save to db
     for share_count in share_counts:
@@ -53,7 +70,7 @@ def do_stats(self):
                 share_count["count"],
             )
             continue
-        stats.count = share_count["count"]
+        stats.count = share_count["count"] + stats.archived_count
         stats.save(update_fields=["count"])
 
     celery_logger.info("[DoStats] End %s", self.request.id)
@@ -71,8 +88,303 @@ def close_no_stock(self):
     for virtual_content in virtual_contents:
         if virtual_content.items_count > virtual_content.receive_histories.count():
             continue
+        virtual_content.end_time = timezone.now()
         with transaction.atomic():
-            VirtualContent.objects.select_for_update().filter(id=virtual_content.id).update(end_time=timezone.now())
+            VirtualContent.objects.select_for_update().filter(id=virtual_content.id).update(
+                end_time=virtual_content.end_time
+            )
+        send_stock(virtual_content)
         celery_logger.info("[CloseNoStock] Auto Close %s", virtual_content.id)
 
     celery_logger.info("[CloseNoStock] End: %s", self.request.id)
+
+
+@app.task(bind=True)
+@task_lock()
+def reap_reservations(self):
+    celery_logger.info("[ReapReservations] Start %s", self.request.id)
+
+    # query db
+    virtual_contents: List[VirtualContent] = VirtualContent.objects.filter(end_time__gt=timezone.now())
+
+    # return expired reservations
+    for virtual_content in virtual_contents:
+        returned, confirmed = virtual_content.reap_reservations()
+        if returned or confirmed:
+            celery_logger.info(
+                "[ReapReservations] %s; Returned: %d; Confirmed: %d", virtual_content.id, returned, confirmed
+            )
+
+    celery_logger.info("[ReapReservations] End %s", self.request.id)
+
+
+@app.task(bind=True)
+@task_lock()
+def reconcile_stock(self):
+    celery_logger.info("[ReconcileStock] Start %s", self.request.id)
+
+    # query db
+    virtual_contents: List[VirtualContent] = list(VirtualContent.objects.filter(end_time__gt=timezone.now()))
+
+    # query redis between loading contents and counting received, receives and imports finishing meanwhile
+    # show as extra stock, which repairing only removes, and never as missing items to push twice
+    pipeline = stock_cache.client.get_client().pipeline(transaction=False)
+    for virtual_content in virtual_contents:
+        virtual_content.count_stock(pipeline)
+    results = iter(pipeline.execute())
+
+    # count received in db
+    received_counts = dict(
+        ReceiveHistory.objects.filter(virtual_content__in=virtual_contents)
+        .values("virtual_content_id")
+        .annotate(count=Count("*"))
+        .values_list("virtual_content_id", "count")
+    )
+
+    # check drift
+    last_drifts = VirtualContent.get_stock_drifts()
+    drifts = {}
+    for virtual_content in virtual_contents:
+        stock = sum(next(results) for _ in virtual_content.items_keys)
+        pending = sum(next(results) for _ in virtual_content.pending_keys)
+        expected = virtual_content.items_count - received_counts.get(virtual_content.id, 0)
+        drift = stock + pending - expected
+        if not drift:
+            continue
+        drifts[virtual_content.id] = drift
+        celery_logger.warning(
+            "[ReconcileStock] Drift %s; Expected: %d; Stock: %d; Pending: %d; Drift: %d",
+            virtual_content.id,
+            expected,
+            stock,
+            pending,
+            drift,
+        )
+        # a receive between saving and confirming drifts for a moment, only repair drift seen twice in a row
+        if not last_drifts.get(virtual_content.id) or virtual_content.lock.locked():
+            continue
+        pushed, removed = virtual_content.repair_items()
+        celery_logger.info("[ReconcileStock] Repair %s; Pushed: %d; Removed: %d", virtual_content.id, pushed, removed)
+
+    # publish as a gauge
+    VirtualContent.set_stock_drifts(drifts)
+
+    celery_logger.info("[ReconcileStock] Checked: %d; Drifted: %d", len(virtual_contents), len(drifts))
+    celery_logger.info("[ReconcileStock] End %s", self.request.id)
+
+
+@app.task(bind=True)
+@task_lock()
+def schedule_prewarm(self):
+    celery_logger.info("[SchedulePrewarm] Start %s", self.request.id)
+
+    if not settings.VCD_PREWARM_SECONDS:
+        celery_logger.info("[SchedulePrewarm] Disabled %s", self.request.id)
+        return
+
+    # catch contents opening before the next scan, while their lead time is still ahead
+    now = timezone.now()
+    lead = datetime.timedelta(seconds=settings.VCD_PREWARM_SECONDS)
+    virtual_contents = VirtualContent.objects.filter(
+        start_time__gt=now, start_time__lte=now + lead + datetime.timedelta(seconds=PREWARM_SCAN_INTERVAL)
+    ).values_list("id", "start_time")
+
+    # one eta task per start time, a moved start time gets its own
+    scheduled = 0
+    for virtual_content_id, start_time in virtual_contents:
+        start_at = int(start_time.timestamp())
+        if not cache.add(
+            key=f"virtual_content:{virtual_content_id}:prewarm:{start_at}",
+            value=start_at,
+            timeout=settings.VCD_PREWARM_SECONDS + PREWARM_SCAN_INTERVAL * 2,
+        ):
+            continue
+        prewarm_content.apply_async(args=(virtual_content_id, start_at), eta=start_time - lead)
+        scheduled += 1
+        celery_logger.info("[SchedulePrewarm] Schedule %s; StartTime: %s", virtual_content_id, start_time)
+
+    celery_logger.info("[SchedulePrewarm] Scheduled %d", scheduled)
+    celery_logger.info("[SchedulePrewarm] End %s", self.request.id)
+
+
+@app.task(bind=True)
+def prewarm_content(self, virtual_content_id: str, start_at: int):
+    celery_logger.info("[PrewarmContent] Start %s; VirtualContent: %s", self.request.id, virtual_content_id)
+
+    # query db, skip when the content is gone or its start time moved
+    virtual_content: VirtualContent = (
+        VirtualContent.objects.filter(id=virtual_content_id).select_related("created_by").first()
+    )
+    if virtual_content is None or int(virtual_content.start_time.timestamp()) != start_at:
+        celery_logger.info("[PrewarmContent] Skip %s; VirtualContent: %s", self.request.id, virtual_content_id)
+        return
+
+    # verify stock, lists may be gone after a redis restart
+    stock = virtual_content.get_stock()
+    expected = virtual_content.items_count - virtual_content.receive_histories.count()
+    if stock != expected and not virtual_content.lock.locked():
+        pushed, removed = virtual_content.repair_items()
+        celery_logger.warning(
+            "[PrewarmContent] Repair %s; Expected: %d; Stock: %d; Pushed: %d; Removed: %d",
+            virtual_content.id,
+            expected,
+            stock,
+            pushed,
+            removed,
+        )
+
+    # open the queue with the verified stock
+    if virtual_content.admission_enabled:
+        virtual_content.open_admission()
+
+    # warm profiles checked by the whitelist and trust level
+    if virtual_content.allowed_users:
+        ProfileSnapshot.load_many(virtual_content.allowed_users)
+
+    # warm detail until a little after the content opens
+    cache_item = VirtualContentViewSet.get_retrieve_cache_item(virtual_content.id)
+    cache_item.timeout = max((virtual_content.start_time - timezone.now()).total_seconds(), 0) + cache_item.timeout
+    cache_item.set_cache(VCSerializer(instance=virtual_content).data)
+
+    celery_logger.info("[PrewarmContent] End %s; VirtualContent: %s", self.request.id, virtual_content_id)
+
+
+@app.task(bind=True)
+@task_lock()
+def schedule_stock_pushes(self):
+    celery_logger.info("[ScheduleStockPushes] Start %s", self.request.id)
+
+    if not settings.VCD_BROADCAST_RATE:
+        celery_logger.info("[ScheduleStockPushes] Disabled %s", self.request.id)
+        return
+
+    # contents opening or closing before the next scan
+    now = timezone.now()
+    until = now + datetime.timedelta(seconds=PREWARM_SCAN_INTERVAL)
+    virtual_contents = VirtualContent.objects.filter(
+        Q(start_time__gt=now, start_time__lte=until) | Q(end_time__gt=now, end_time__lte=until)
+    ).values_list("id", "start_time", "end_time")
+
+    # one eta push per transition, viewers see it without waiting for a receive
+    scheduled = 0
+    for virtual_content_id, start_time, end_time in virtual_contents:
+        for transition_time in [start_time, end_time]:
+            if not now < transition_time <= until:
+                continue
+            transition_at = int(transition_time.timestamp())
+            if not cache.add(
+                key=f"virtual_content:{virtual_content_id}:push:{transition_at}",
+                value=transition_at,
+                timeout=PREWARM_SCAN_INTERVAL * 2,
+            ):
+                continue
+            # one second late, so the state has already changed
+            push_stock.apply_async(args=(virtual_content_id,), eta=transition_time + datetime.timedelta(seconds=1))
+            scheduled += 1
+
+    celery_logger.info("[ScheduleStockPushes] Scheduled %d", scheduled)
+    celery_logger.info("[ScheduleStockPushes] End %s", self.request.id)
+
+
+@app.task(bind=True)
+def push_stock(self, virtual_content_id: str):
+    # query db
+    virtual_content = VirtualContent.objects.filter(id=virtual_content_id).first()
+    if virtual_content is None:
+        return
+
+    # open a new window, changes inside it wait for its end
+    window_key, _ = get_broadcast_keys(virtual_content_id)
+    stock_cache.client.get_client().set(window_key, 1, px=get_broadcast_interval())
+    send_stock(virtual_content)
+
+    celery_logger.info("[PushStock] %s %s", self.request.id, virtual_content_id)
+
+
+def add_stats_count(model: Type[Union[UserReceiveStats, UserShareStats]], counts: Dict[str, int]) -> None:
+    # one insert for new users and one update per distinct count, do_stats corrects any race later
+    exists = set(model.objects.filter(user_id__in=counts.keys()).values_list("user_id", flat=True))
+    model.objects.bulk_create(
+        [model(user_id=user_id, count=count) for user_id, count in counts.items() if user_id not in exists],
+        ignore_conflicts=True,
+    )
+    user_ids_by_count: Dict[int, List[str]] = {}
+    for user_id, count in counts.items():
+        if user_id in exists:
+            user_ids_by_count.setdefault(count, []).append(user_id)
+    for count, user_ids in user_ids_by_count.items():
+        model.objects.filter(user_id__in=user_ids).update(count=F("count") + count)
+
+
+@app.task(bind=True)
+@task_lock()
+def draw_lotteries(self):
+    celery_logger.info("[DrawLotteries] Start %s", self.request.id)
+
+    # query db
+    virtual_contents: List[VirtualContent] = VirtualContent.objects.filter(
+        distribution_mode=DistributionMode.LOTTERY, drawn_at__isnull=True, end_time__lte=timezone.now()
+    )
+
+    # draw and save stats
+    for virtual_content in virtual_contents:
+        histories = virtual_content.draw()
+        send_stock(virtual_content)
+        if not histories:
+            celery_logger.info("[DrawLotteries] No Winner %s", virtual_content.id)
+            continue
+        add_stats_count(UserReceiveStats, Counter(history.receiver_id for history in histories))
+        add_stats_count(UserShareStats, {virtual_content.created_by_id: len(histories)})
+        celery_logger.info("[DrawLotteries] Drawn %s; Winners: %d", virtual_content.id, len(histories))
+
+    celery_logger.info("[DrawLotteries] End %s", self.request.id)
+
+
+def add_archived_count(model: Type[Union[UserReceiveStats, UserShareStats]], counts: Dict[str, int]) -> None:
+    for user_id, count in counts.items():
+        stats, is_create = model.objects.get_or_create(
+            user_id=user_id, defaults={"count": count, "archived_count": count}
+        )
+        if not is_create:
+            model.objects.filter(id=stats.id).update(archived_count=F("archived_count") + count)
+
+
+def on_receive_histories_archived(rows: List[dict]) -> None:
+    # keep totals of contents and ranks after rows leave the table
+    for virtual_content_id, count in Counter(row["virtual_content_id"] for row in rows).items():
+        VirtualContent.objects.filter(id=virtual_content_id).update(archived_count=F("archived_count") + count)
+    add_archived_count(UserReceiveStats, Counter(row["receiver_id"] for row in rows))
+    add_archived_count(UserShareStats, Counter(row["virtual_content__created_by"] for row in rows))
+
+
+@app.task(bind=True)
+@task_lock()
+def archive_receive_histories(self):
+    celery_logger.info("[ArchiveReceiveHistories] Start %s", self.request.id)
+
+    if not settings.VCD_HISTORY_RETENTION_DAYS:
+        celery_logger.info("[ArchiveReceiveHistories] Disabled %s", self.request.id)
+        return
+
+    # only contents ended long ago, active ones rely on their histories
+    archived = archive_queryset(
+        queryset=ReceiveHistory.objects.filter(
+            virtual_content__end_time__lt=timezone.now() - datetime.timedelta(days=settings.VCD_HISTORY_RETENTION_DAYS)
+        ),
+        name="receive_history",
+        time_field="received_at",
+        fields=[
+            "virtual_content_id",
+            "virtual_content__created_by",
+            "virtual_content_item_id",
+            "receiver_id",
+            "received_at",
+            "client_ip",
+            "header_profile_id",
+            "headers",
+        ],
+        on_batch=on_receive_histories_archived,
+    )
+    celery_logger.info("[ArchiveReceiveHistories] Archived %d", archived)
+
+    celery_logger.info("[ArchiveReceiveHistories] End %s", self.request.id)
@@ -0,0 +1,69 @@
+import datetime
+from importlib import import_module
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.test import TestCase
+from django.utils import timezone
+from ovinc_client.account.models import User
+from rest_framework.test import APIClient
+
+from apps.core.utils import stock_cache
+from apps.oauth.models import UserProfile
+from apps.vcd.models import VirtualContent
+from apps.vcd.throttling import ReceiveIPThrottle, ReceiveThrottle
+
+
+class VirtualContentTestMixin:
+    """
+    An open virtual content with items in stock, receivers skip throttles
+    """
+
+    content_options: dict = {}
+    item_count: int = 2
+
+    def setUp(self):
+        super().setUp()
+        stock_cache.client.get_client().flushall()
+        self.owner = User.objects.create(username="owner")
+        self.virtual_content = VirtualContent.objects.create(
+            name=self.__class__.__name__,
+            allowed_trust_levels=[2],
+            start_time=timezone.now() - datetime.timedelta(minutes=1),
+            end_time=timezone.now() + datetime.timedelta(days=1),
+            created_by=self.owner,
+            **self.content_options,
+        )
+        self.virtual_content.import_items([f"content-{i}" for i in range(self.item_count)])
+
+    def create_receiver(self, username: str) -> User:
+        user = User.objects.create(username=username)
+        UserProfile.objects.create(user=user, email="", avatar="", trust_level=2, api_key="")
+        return user
+
+    def get_client(self, user: User) -> APIClient:
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def get_session_cookie(self, user: User) -> bytes:
+        # session of a logged in user, for requests through the asgi application
+        session = import_module(settings.SESSION_ENGINE).SessionStore()
+        session[SESSION_KEY] = user.pk
+        session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.create()
+        return f"{settings.SESSION_COOKIE_NAME}={session.session_key}".encode()
+
+    def receive(self, user: User):
+        with mock.patch.object(ReceiveThrottle, "allow_request", return_value=True), mock.patch.object(
+            ReceiveIPThrottle, "allow_request", return_value=True
+        ):
+            return self.get_client(user).post(f"/virtual_content/{self.virtual_content.id}/receive/", {}, format="json")
+
+
+class VirtualContentTestCase(VirtualContentTestMixin, TestCase):
+    """
+    Virtual content in a test wrapped by a transaction
+    """
@@ -0,0 +1,30 @@
+from apps.core.utils import stock_cache
+from apps.vcd.models import ReceiveHistory, VirtualContent
+from apps.vcd.tests.base import VirtualContentTestCase
+
+
+class AdmissionTestCase(VirtualContentTestCase):
+    """
+    Admission queue in front of receiving
+    """
+
+    content_options = {"admission_enabled": True}
+
+    def setUp(self):
+        super().setUp()
+        self.virtual_content.open_admission()
+        # the queue is full
+        admission_key, _ = VirtualContent.get_admission_keys(self.virtual_content.id)
+        stock_cache.client.get_client().hset(admission_key, "limit", 0)
+
+    def test_rejected_when_full(self):
+        self.assertNotEqual(self.receive(self.create_receiver("user-0")).status_code, 200)
+        self.assertFalse(ReceiveHistory.objects.exists())
+
+    def test_disabled_queue_admits(self):
+        response = self.get_client(self.owner).put(
+            f"/virtual_content/{self.virtual_content.id}/", {"admission_enabled": False}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.receive(self.create_receiver("user-0")).status_code, 200)
+        self.assertEqual(ReceiveHistory.objects.count(), 1)
@@ -0,0 +1,38 @@
+from asgiref.sync import async_to_sync
+from channels.testing import WebsocketCommunicator
+from django.conf import settings
+
+from apps.vcd.tests.base import VirtualContentTestCase
+from entry.asgi import application
+
+
+class VirtualContentConsumerTestCase(VirtualContentTestCase):
+    """
+    Live stock over websocket
+    """
+
+    def connect(self, origin: str):
+        cookie = self.get_session_cookie(self.owner)
+
+        async def run():
+            communicator = WebsocketCommunicator(
+                application,
+                f"/ws/virtual_content/{self.virtual_content.id}/",
+                headers=[(b"origin", origin.encode()), (b"cookie", cookie)],
+            )
+            connected, _ = await communicator.connect()
+            state = await communicator.receive_json_from() if connected else None
+            await communicator.disconnect()
+            return connected, state
+
+        return async_to_sync(run)()
+
+    def test_frontend_origin(self):
+        connected, state = self.connect(settings.FRONTEND_URL)
+        self.assertTrue(connected)
+        self.assertEqual(state["id"], self.virtual_content.id)
+        self.assertEqual(state["stock"], 2)
+
+    def test_other_origin(self):
+        connected, _ = self.connect("https://other.example.com")
+        self.assertFalse(connected)
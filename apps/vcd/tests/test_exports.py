@@ -0,0 +1,79 @@
+import csv
+from io import StringIO
+from typing import List
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.test import TransactionTestCase, override_settings
+
+from apps.vcd.exports import ReceiveHistoryExporter
+from apps.vcd.tests.base import VirtualContentTestMixin
+from entry.asgi import application
+
+
+@override_settings(VCD_EXPORT_BATCH_SIZE=2)
+class ExportTestCase(VirtualContentTestMixin, TransactionTestCase):
+    """
+    Receive history streamed through the asgi application
+    """
+
+    item_count = 5
+
+    def setUp(self):
+        super().setUp()
+        for i in range(self.item_count):
+            self.receive(self.create_receiver(f"user-{i}"))
+
+    def export(self, file_type: str):
+        """
+        return sent messages and how many bodies were sent before each batch was loaded
+        """
+
+        messages: List[dict] = []
+        sent_before_batches: List[int] = []
+        get_rows = ReceiveHistoryExporter.get_rows
+
+        def record(exporter, last_id):
+            sent_before_batches.append(len([message for message in messages if message.get("body")]))
+            return get_rows(exporter, last_id)
+
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": f"/virtual_content/{self.virtual_content.id}/export/",
+            "raw_path": f"/virtual_content/{self.virtual_content.id}/export/".encode(),
+            "query_string": f"file_type={file_type}".encode(),
+            "root_path": "",
+            "headers": [(b"host", b"testserver"), (b"cookie", self.get_session_cookie(self.owner))],
+            "client": ("127.0.0.1", 12345),
+            "server": ("testserver", 80),
+        }
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message: dict):
+            messages.append(message)
+
+        with mock.patch.object(ReceiveHistoryExporter, "get_rows", record):
+            async_to_sync(application)(scope, receive, send)
+        return messages, sent_before_batches
+
+    def test_export_csv(self):
+        messages, sent_before_batches = self.export("csv")
+        self.assertEqual(messages[0]["status"], 200)
+        rows = list(csv.reader(StringIO(b"".join(message.get("body", b"") for message in messages[1:]).decode())))
+        self.assertEqual(rows[0], ReceiveHistoryExporter.headers)
+        self.assertEqual([row[1] for row in rows[1:]], [f"user-{i}" for i in range(self.item_count)])
+        # later batches are loaded after earlier rows went out, not all before the first byte
+        self.assertEqual(len(sent_before_batches), 4)
+        self.assertGreater(sent_before_batches[-1], 2)
+
+    def test_export_ndjson(self):
+        messages, _ = self.export("ndjson")
+        self.assertEqual(messages[0]["status"], 200)
+        lines = b"".join(message.get("body", b"") for message in messages[1:]).splitlines()
+        self.assertEqual(len(lines), self.item_count)
@@ -0,0 +1,54 @@
+import datetime
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from ovinc_client.account.models import User
+
+from apps.vcd.fields import CONTENT_MARKER, ENCRYPTED_TAG
+from apps.vcd.models import VirtualContent, VirtualContentItem
+
+
+@override_settings(VCD_ITEM_ENCRYPT_KEY="", VCD_ITEM_COMPRESS_MIN_LENGTH=0)
+class EncryptItemsTestCase(TestCase):
+    """
+    Encrypt items stored as plain text
+    """
+
+    def setUp(self):
+        self.virtual_content = VirtualContent.objects.create(
+            name="fields",
+            allowed_trust_levels=[2],
+            start_time=timezone.now(),
+            end_time=timezone.now() + datetime.timedelta(days=1),
+            created_by=User.objects.create(username="owner"),
+        )
+        self.contents = ["plain-0", f"{CONTENT_MARKER}looks encoded", "plain-2"]
+        self.items = [
+            VirtualContentItem.objects.create(virtual_content=self.virtual_content, content=content)
+            for content in self.contents
+        ]
+
+    def get_stored(self) -> list:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT content FROM vcd_virtualcontentitem ORDER BY id")
+            return [row[0] for row in cursor.fetchall()]
+
+    def test_encrypt_items(self):
+        self.assertEqual(self.get_stored()[0], "plain-0")
+        with override_settings(VCD_ITEM_ENCRYPT_KEY="key"):
+            # plain items stay readable before the command runs
+            self.assertEqual([item.content for item in VirtualContentItem.objects.order_by("id")], self.contents)
+            call_command("encrypt_items", batch_size=2, stdout=StringIO())
+            stored = self.get_stored()
+            self.assertTrue(all(value.startswith(f"{CONTENT_MARKER}{ENCRYPTED_TAG}") for value in stored))
+            self.assertEqual([item.content for item in VirtualContentItem.objects.order_by("id")], self.contents)
+            # a second run finds nothing left
+            call_command("encrypt_items", stdout=StringIO())
+            self.assertEqual(self.get_stored(), stored)
+
+    def test_key_required(self):
+        with self.assertRaises(CommandError):
+            call_command("encrypt_items", stdout=StringIO())
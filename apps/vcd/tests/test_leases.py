@@ -0,0 +1,69 @@
+from unittest import mock
+
+from django.test import override_settings
+from django.utils import timezone
+
+from apps.core.utils import stock_cache
+from apps.vcd import leases
+from apps.vcd.models import ReceiveHistory, VirtualContent
+from apps.vcd.tasks import reconcile_stock
+from apps.vcd.tests.base import VirtualContentTestCase
+
+
+@override_settings(VCD_LEASE_SIZE=10, VCD_LEASE_MIN_STOCK=0)
+class LeaseTestCase(VirtualContentTestCase):
+    """
+    Items leased by one process
+    """
+
+    item_count = 30
+
+    def setUp(self):
+        super().setUp()
+        leases._leases.clear()  # pylint: disable=W0212
+
+    def tearDown(self):
+        leases._leases.clear()  # pylint: disable=W0212
+
+    def test_give_back_at_exit(self):
+        self.virtual_content.get_one_item("user")
+        self.assertEqual(self.virtual_content.get_stock(), 30)
+        leases.give_back_leases()
+        client = stock_cache.client.get_client()
+        self.assertEqual(client.llen(self.virtual_content.get_items_key(0)), 29)
+        self.assertEqual(client.zcard(self.virtual_content.get_pending_key(0)), 1)
+        self.assertFalse(leases._leases)  # pylint: disable=W0212
+
+    def test_reap_after_crash(self):
+        self.virtual_content.get_one_item("user")
+        # the process dies without giving back
+        leases._leases.clear()  # pylint: disable=W0212
+        with mock.patch("time.time", return_value=timezone.now().timestamp() + 3600):
+            returned, confirmed = self.virtual_content.reap_reservations()
+        self.assertEqual((returned, confirmed), (10, 0))
+        client = stock_cache.client.get_client()
+        self.assertEqual(client.llen(self.virtual_content.get_items_key(0)), 30)
+        self.assertEqual(client.zcard(self.virtual_content.get_pending_key(0)), 0)
+
+    def test_no_give_back_after_deadline(self):
+        self.virtual_content.get_one_item("user-0")
+        lease = leases._leases.pop(self.virtual_content.get_items_key(0))  # pylint: disable=W0212
+        client = stock_cache.client.get_client()
+        client.ltrim(self.virtual_content.get_items_key(0), 1, 0)
+        with mock.patch("time.time", return_value=timezone.now().timestamp() + 3600):
+            # the reaper returned the lease and another process reserved its items
+            self.virtual_content.reap_reservations()
+            item = self.virtual_content.get_one_item("user-1")
+            # the expired lease is given back late
+            lease.give_back()
+        self.assertIsNotNone(client.zscore(self.virtual_content.get_pending_key(0), item.id))
+        self.assertNotIn(str(item.id).encode(), client.lrange(self.virtual_content.get_items_key(0), 0, -1))
+
+    def test_stock_exact_after_receive(self):
+        for i in range(8):
+            self.assertEqual(self.receive(self.create_receiver(f"user-{i}")).status_code, 200)
+        self.assertEqual(ReceiveHistory.objects.count(), 8)
+        self.assertEqual(self.virtual_content.get_stock(), 22)
+        with mock.patch.object(VirtualContent, "repair_items") as repair_items:
+            reconcile_stock.apply()
+        repair_items.assert_not_called()
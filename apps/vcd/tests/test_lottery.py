@@ -0,0 +1,31 @@
+from django.utils import timezone
+
+from apps.vcd.constants import DistributionMode
+from apps.vcd.tests.base import VirtualContentTestCase
+
+
+class LotteryRegisterTestCase(VirtualContentTestCase):
+    """
+    Registration of lottery contents
+    """
+
+    content_options = {"distribution_mode": DistributionMode.LOTTERY}
+
+    def register(self, username: str):
+        return self.get_client(self.create_receiver(username)).post(
+            f"/virtual_content/{self.virtual_content.id}/register/", {}, format="json"
+        )
+
+    def test_register(self):
+        self.assertEqual(self.register("user-0").status_code, 200)
+        self.assertTrue(self.virtual_content.is_registered("user-0"))
+
+    def test_register_after_draw(self):
+        # end time extended after the draw
+        self.virtual_content.drawn_at = timezone.now()
+        self.virtual_content.save(update_fields=["drawn_at"])
+        self.assertNotEqual(self.register("user-0").status_code, 200)
+        self.assertFalse(self.virtual_content.is_registered("user-0"))
+
+    def test_receive_not_allowed(self):
+        self.assertNotEqual(self.receive(self.create_receiver("user-0")).status_code, 200)
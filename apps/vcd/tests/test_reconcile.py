@@ -0,0 +1,32 @@
+from unittest import mock
+
+from apps.core.utils import stock_cache
+from apps.vcd.models import VirtualContent
+from apps.vcd.tasks import reconcile_stock
+from apps.vcd.tests.base import VirtualContentTestCase
+
+
+class ReconcileStockTestCase(VirtualContentTestCase):
+    """
+    Stock in redis checked against db
+    """
+
+    item_count = 5
+
+    def test_no_drift(self):
+        with mock.patch.object(VirtualContent, "repair_items") as repair_items:
+            reconcile_stock.apply()
+        repair_items.assert_not_called()
+        self.assertEqual(VirtualContent.get_stock_drifts(), {})
+
+    def test_repair_lasting_drift(self):
+        # an item lost from redis
+        stock_cache.client.get_client().lpop(self.virtual_content.get_items_key(0))
+        with mock.patch.object(VirtualContent, "repair_items", return_value=(0, 0)) as repair_items:
+            reconcile_stock.apply()
+        repair_items.assert_not_called()
+        self.assertEqual(VirtualContent.get_stock_drifts(), {self.virtual_content.id: -1})
+        reconcile_stock.apply()
+        self.assertEqual(self.virtual_content.get_stock(), 5)
+        reconcile_stock.apply()
+        self.assertEqual(VirtualContent.get_stock_drifts(), {})
@@ -0,0 +1,54 @@
+from contextlib import ExitStack
+from typing import Callable, Tuple
+
+from django.core.cache import cache
+from django.db import connections
+from django.test import TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+
+from apps.vcd.models import ReceiveHistory
+from apps.vcd.tests.base import VirtualContentTestMixin
+
+
+class ReplicaRouterTestCase(VirtualContentTestMixin, TransactionTestCase):
+    """
+    Reads of listings on the replica, detail and receiving on the primary
+    """
+
+    databases = {"default", "replica"}
+
+    def setUp(self):
+        cache.clear()
+        super().setUp()
+        self.client = self.get_client(self.owner)
+
+    def count_queries(self, func: Callable) -> Tuple[int, int]:
+        with ExitStack() as stack:
+            primary = stack.enter_context(CaptureQueriesContext(connections["default"]))
+            replica = stack.enter_context(CaptureQueriesContext(connections["replica"]))
+            response = func()
+        self.assertEqual(response.status_code, 200)
+        return len(primary), len(replica)
+
+    def test_reads_on_replica(self):
+        for url in [
+            "/virtual_content/",
+            f"/virtual_content/{self.virtual_content.id}/receive_history/",
+        ]:
+            cache.clear()
+            primary, replica = self.count_queries(lambda url=url: self.client.get(url))
+            self.assertEqual(primary, 0, url)
+            self.assertGreater(replica, 0, url)
+
+    def test_detail_on_primary(self):
+        # a content just created or updated should not be missed or cached stale for the replication lag
+        primary, replica = self.count_queries(lambda: self.client.get(f"/virtual_content/{self.virtual_content.id}/"))
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+
+    def test_receive_on_primary(self):
+        receiver = self.create_receiver("user-0")
+        primary, replica = self.count_queries(lambda: self.receive(receiver))
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+        self.assertEqual(ReceiveHistory.objects.count(), 1)
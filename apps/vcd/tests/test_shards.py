@@ -0,0 +1,62 @@
+from unittest import mock
+
+from redis import Redis
+from redis.client import Pipeline
+from redis.crc import key_slot
+
+from apps.vcd.constants import DistributionMode
+from apps.vcd.models import VirtualContent
+from apps.vcd.tests.base import VirtualContentTestCase
+
+
+class StockShardTestCase(VirtualContentTestCase):
+    """
+    Stock spread over shards on a cluster
+    """
+
+    content_options = {"stock_shards": 4}
+    item_count = 20
+
+    def setUp(self):
+        super().setUp()
+        self.virtual_content.get_one_item("user")
+
+    def assert_single_slot_deletes(self, func) -> None:
+        commands = []
+        execute_command = Redis.execute_command
+        pipeline_execute_command = Pipeline.pipeline_execute_command
+
+        def record(execute):
+            def wrapper(client, *args, **options):
+                commands.append(args)
+                return execute(client, *args, **options)
+
+            return wrapper
+
+        with mock.patch.object(Redis, "execute_command", record(execute_command)), mock.patch.object(
+            Pipeline, "pipeline_execute_command", record(pipeline_execute_command)
+        ):
+            func()
+        deletes = [args[1:] for args in commands if str(args[0]).upper() == "DEL"]
+        self.assertTrue(deletes)
+        for keys in deletes:
+            self.assertEqual(len({key_slot(str(key).encode()) for key in keys}), 1, keys)
+
+    def test_claim_keys_in_one_slot(self):
+        for stock_shards in [1, 4]:
+            self.virtual_content.stock_shards = stock_shards
+            for shard in range(stock_shards):
+                self.assertEqual(
+                    key_slot(self.virtual_content.get_items_key(shard).encode()),
+                    key_slot(self.virtual_content.get_pending_key(shard).encode()),
+                )
+
+    def test_reload_items(self):
+        self.assert_single_slot_deletes(self.virtual_content.reload_items)
+        self.assertEqual(self.virtual_content.get_stock(), 20)
+
+    def test_draw(self):
+        VirtualContent.objects.filter(id=self.virtual_content.id).update(distribution_mode=DistributionMode.LOTTERY)
+        self.virtual_content.refresh_from_db()
+        self.assert_single_slot_deletes(self.virtual_content.draw)
+        self.assertEqual(self.virtual_content.get_stock(), 0)
@@ -1,5 +1,16 @@
-from rest_framework.throttling import UserRateThrottle
+from apps.core.throttling import IPRedisRateThrottle, UserRedisRateThrottle
 
 
-class ReceiveThrottle(UserRateThrottle):
+class ReceiveThrottle(UserRedisRateThrottle):
     scope = "receive_virtual_content"
+
+
+class ReceiveIPThrottle(IPRedisRateThrottle):
+    scope = "receive_virtual_content_ip"
+
+
+class ReceiveContentThrottle(UserRedisRateThrottle):
+    scope = "receive_virtual_content_user_content"
+
+    def get_cache_key(self, request, view) -> str:
+        return f"{super().get_cache_key(request, view)}:{view.kwargs.get('pk')}"
@@ -1,6 +1,12 @@
+from typing import Optional
+
 from django.conf import settings
+from django.core.cache import cache
 from django.db import IntegrityError, transaction
+from django.http import HttpRequest, StreamingHttpResponse
 from django.utils import timezone
+from ovinc_client.core.cache import CacheItem
+from ovinc_client.core.models import RequestMock
 from ovinc_client.core.utils import get_ip
 from ovinc_client.core.viewsets import (
     CreateMixin,
@@ -14,18 +20,28 @@ from rest_framework.decorators import action
 from rest_framework.request import Request
 from rest_framework.response import Response
 
+from apps.core.renderers import ORJSONAPIRenderer
+from apps.core.viewsets import IdempotentMixin, ReplicaReadMixin
 from apps.tcaptcha.constants import InstanceType
 from apps.tcaptcha.exceptions import TCaptchaInvalid
 from apps.tcaptcha.utils import TCaptchaVerify
+from apps.vcd.broadcasts import broadcast_stock
+from apps.vcd.constants import DistributionMode, ExportFileType
 from apps.vcd.exceptions import (
+    AdmissionRejected,
     AlreadyReceived,
+    DistributionModeNotMatch,
+    NoStock,
     SameIPReceivedBefore,
+    VCArchived,
     VCClosed,
     VCHasUserReceivedError,
     VCLocked,
     VCNotOpen,
 )
+from apps.vcd.exports import ReceiveHistoryExporter
 from apps.vcd.models import (
+    HeaderProfile,
     ReceiveHistory,
     UserReceiveStats,
     UserShareStats,
@@ -34,26 +50,44 @@ from apps.vcd.models import (
 from apps.vcd.permissions import ReceiveHistoryPermission, VirtualContentPermission
 from apps.vcd.serializers import (
     CreateVCSerializer,
-    ReceiveHistoryHideUserInfoSerializer,
-    ReceiveHistoryPublicSerializer,
+    ExportReceiveHistorySerializer,
+    LotteryRegistrationSerializer,
+    ReceiveHistoryPageSerializer,
     ReceiveHistoryUserSerializer,
     UpdateVCSerializer,
     VCSerializer,
 )
-from apps.vcd.throttling import ReceiveThrottle
+from apps.vcd.throttling import (
+    ReceiveContentThrottle,
+    ReceiveIPThrottle,
+    ReceiveThrottle,
+)
 
 
 # pylint: disable=R0901
-class VirtualContentViewSet(RetrieveMixin, CreateMixin, UpdateMixin, DestroyMixin, ListMixin, MainViewSet):
+class VirtualContentViewSet(
+    IdempotentMixin, ReplicaReadMixin, RetrieveMixin, CreateMixin, UpdateMixin, DestroyMixin, ListMixin, MainViewSet
+):
     """
     Virtual Content
     """
 
     queryset = VirtualContent.get_queryset()
     permission_classes = [VirtualContentPermission]
+    renderer_classes = [ORJSONAPIRenderer]
+    replica_actions = ["list", "receive_history"]
+    idempotent_actions = ["receive"]
+    # a retry may pass a new captcha, or come after the content opens or unlocks
+    idempotent_retryable_exceptions = (TCaptchaInvalid, VCNotOpen, VCLocked, AdmissionRejected)
     cache_user_bind = False
     cache_timeout = 5
 
+    @classmethod
+    def get_retrieve_cache_item(cls, virtual_content_id: str) -> CacheItem:
+        # same key as retrieve builds for a plain GET, so tasks can warm or drop it
+        # pylint: disable=W0212
+        return cls()._build_cache_item(RequestMock(None, {}, HttpRequest()), pk=virtual_content_id)
+
     def list(self, request: Request, *args, **kwargs) -> Response:
         # query db
         contents = VirtualContent.objects.filter(created_by=request.user).prefetch_related("created_by")
@@ -89,7 +123,7 @@ class VirtualContentViewSet(RetrieveMixin, CreateMixin, UpdateMixin, DestroyMixi
         # load inst
         inst: VirtualContent = self.get_object()
         # check for receive
-        if inst.receive_histories.all().count() > 0:
+        if inst.archived_count > 0 or inst.receive_histories.all().count() > 0:
             raise VCHasUserReceivedError()
         # delete
         inst.delete()
@@ -100,11 +134,22 @@ class VirtualContentViewSet(RetrieveMixin, CreateMixin, UpdateMixin, DestroyMixi
         inst: VirtualContent = self.get_object()
         if inst.lock.locked():
             raise VCLocked()
+        # archived receivers are no longer guarded by the unique key
+        if inst.archived_count > 0:
+            raise VCArchived()
         # validate
         req_slz = UpdateVCSerializer(instance=inst, data=request.data, partial=True)
         req_slz.is_valid(raise_exception=True)
         # save
+        admission_enabled = inst.admission_enabled
         req_slz.save()
+        # tickets of a disabled queue should not keep turning users away
+        if admission_enabled and not inst.admission_enabled:
+            inst.close_admission()
+        # drop prewarmed detail, it may live longer than cache_timeout
+        cache.delete(self.get_retrieve_cache_item(inst.id).cache_key)
+        # times or stock may have changed
+        broadcast_stock(inst)
         return Response()
 
     @action(methods=["GET"], detail=True)
@@ -115,44 +160,65 @@ class VirtualContentViewSet(RetrieveMixin, CreateMixin, UpdateMixin, DestroyMixi
             return Response(cached_data)
         # load inst
         inst: VirtualContent = self.get_object()
-        # load history
-        histories = inst.receive_histories.all().prefetch_related("receiver", "receiver__profile")
+        # load history with receiver and profile joined
+        histories = inst.receive_histories.values(*ReceiveHistoryPageSerializer.fields)
         # page
         page = self.paginate_queryset(histories)
         # serialize
-        if inst.show_receiver or request.user == inst.created_by:
-            slz = ReceiveHistoryPublicSerializer(instance=page, many=True)
-        else:
-            slz = ReceiveHistoryHideUserInfoSerializer(instance=page, many=True)
+        slz = ReceiveHistoryPageSerializer(
+            instance=page, hide_user_info=not (inst.show_receiver or request.user.pk == inst.created_by_id)
+        )
         data = self.get_paginated_response(slz.data)
         # save to cache
         self.set_cache(data.data, request, *args, **kwargs)
         return data
 
-    @action(methods=["POST"], detail=True, throttle_classes=[ReceiveThrottle])
-    def receive(self, request: Request, *args, **kwargs) -> Response:
-        # validate tcaptcha
-        if settings.CAPTCHA_ENABLED:
-            tcaptcha = request.data.get("tcaptcha") or {}
-            if not TCaptchaVerify(user=request.user, user_ip=get_ip(request), tcaptcha=tcaptcha).verify(
-                instance_type=InstanceType.VIRTUAL_CONTENT, instance_id=kwargs["pk"]
-            ):
-                raise TCaptchaInvalid()
+    @action(methods=["GET"], detail=True)
+    def export(self, request: Request, *args, **kwargs) -> StreamingHttpResponse:
+        # validate
+        req_slz = ExportReceiveHistorySerializer(data=request.query_params)
+        req_slz.is_valid(raise_exception=True)
+        file_type = req_slz.validated_data["file_type"]
         # load inst
         inst: VirtualContent = self.get_object()
+        # stream without caching
+        exporter = ReceiveHistoryExporter(inst)
+        if file_type == ExportFileType.NDJSON:
+            response = StreamingHttpResponse(exporter.iter_ndjson(), content_type="application/x-ndjson")
+        else:
+            response = StreamingHttpResponse(exporter.iter_csv(), content_type="text/csv")
+        response["Content-Disposition"] = f'attachment; filename="receive_history_{inst.id}.{file_type}"'
+        return response
+
+    @action(
+        methods=["POST"], detail=True, throttle_classes=[ReceiveThrottle, ReceiveIPThrottle, ReceiveContentThrottle]
+    )
+    def receive(self, request: Request, *args, **kwargs) -> Response:
+        inst: Optional[VirtualContent] = None
+        try:
+            # load inst
+            inst = self.get_object()
+            return self.do_receive(request, inst)
+        except (AlreadyReceived, NoStock):
+            raise
+        except Exception as err:
+            # leaving without an item frees the ticket for the next user, tickets exist only when the queue is enabled
+            if inst is None or inst.admission_enabled:
+                VirtualContent.leave_admission(kwargs["pk"], request.user.username)
+            raise err
+
+    def do_receive(self, request: Request, inst: VirtualContent) -> Response:
         if inst.lock.locked():
             raise VCLocked()
-        # check time
-        now = timezone.now()
-        if now < inst.start_time:
-            raise VCNotOpen()
-        if now > inst.end_time:
-            raise VCClosed()
+        # lottery contents are drawn at close
+        self.check_open(request, inst, DistributionMode.FCFS)
+        # queue was not open when checking permission
+        if inst.admission_enabled and not inst.admit(request.user.username):
+            raise AdmissionRejected()
         # init data
-        headers = dict(request.headers)
-        headers.pop("Cookie", None)
-        # load item
-        item = inst.get_one_item()
+        header_profile_id = HeaderProfile.get_profile_id(request.headers)
+        # reserve item
+        item = inst.get_one_item(request.user.username)
         # save
         with transaction.atomic():
             try:
@@ -161,33 +227,96 @@ class VirtualContentViewSet(RetrieveMixin, CreateMixin, UpdateMixin, DestroyMixi
                     virtual_content_item=item,
                     receiver=request.user,
                     client_ip=get_ip(request),
-                    headers=headers,
+                    header_profile_id=header_profile_id,
                 )
                 # check same ip
                 if not inst.log_ip(get_ip(request)):
                     raise SameIPReceivedBefore()
             except IntegrityError as err:
-                inst.push_items(item.id)
+                inst.release_item(item.id)
                 raise AlreadyReceived() from err
             except Exception as err:
-                inst.push_items(item.id)
+                inst.release_item(item.id)
                 raise err
+        # confirm reservation
+        inst.confirm_item(item.id)
+        # tell viewers
+        broadcast_stock(inst)
         return Response(history.id)
 
+    def check_open(self, request: Request, inst: VirtualContent, distribution_mode: str) -> None:
+        # validate tcaptcha
+        if settings.CAPTCHA_ENABLED:
+            tcaptcha = request.data.get("tcaptcha") or {}
+            if not TCaptchaVerify(user=request.user, user_ip=get_ip(request), tcaptcha=tcaptcha).verify(
+                instance_type=InstanceType.VIRTUAL_CONTENT, instance_id=str(inst.id)
+            ):
+                raise TCaptchaInvalid()
+        # check mode
+        if inst.distribution_mode != distribution_mode:
+            raise DistributionModeNotMatch()
+        # check time
+        now = timezone.now()
+        if now < inst.start_time:
+            raise VCNotOpen()
+        if now > inst.end_time:
+            raise VCClosed()
+
+    @action(methods=["POST"], detail=True, throttle_classes=[ReceiveThrottle, ReceiveIPThrottle])
+    def register(self, request: Request, *args, **kwargs) -> Response:
+        # load inst
+        inst: VirtualContent = self.get_object()
+        self.check_open(request, inst, DistributionMode.LOTTERY)
+        # drawn before end time was extended, no draw would pick new registrations
+        if inst.drawn_at:
+            raise VCClosed()
+        # registered before
+        if inst.is_registered(request.user.username):
+            return Response()
+        # check same ip
+        if not inst.log_ip(get_ip(request)):
+            raise SameIPReceivedBefore()
+        # save to redis, the draw writes histories
+        inst.register(
+            username=request.user.username,
+            client_ip=get_ip(request),
+            header_profile_id=HeaderProfile.get_profile_id(request.headers),
+        )
+        return Response()
+
+    @action(methods=["GET"], detail=True)
+    def registration(self, request: Request, *args, **kwargs) -> Response:
+        # load inst
+        inst: VirtualContent = self.get_object()
+        # load result
+        history_id = inst.receive_histories.filter(receiver=request.user).values_list("id", flat=True).first()
+        slz = LotteryRegistrationSerializer(
+            instance={
+                "registered": history_id is not None or inst.is_registered(request.user.username),
+                "drawn_at": inst.drawn_at,
+                "receive_history": history_id,
+            }
+        )
+        return Response(slz.data)
+
 
 # pylint: disable=R0901
-class ReceiveHistoryViewSet(ListMixin, MainViewSet):
+class ReceiveHistoryViewSet(ReplicaReadMixin, ListMixin, MainViewSet):
     """
     Receive History
     """
 
     queryset = ReceiveHistory.get_queryset()
     permission_classes = [ReceiveHistoryPermission]
+    renderer_classes = [ORJSONAPIRenderer]
+    replica_actions = ["list"]
 
     def list(self, request: Request, *args, **kwargs) -> Response:
         # load history
-        histories = ReceiveHistory.objects.filter(receiver=request.user).prefetch_related(
-            "virtual_content", "virtual_content_item"
+        histories = (
+            ReceiveHistory.objects.filter(receiver=request.user)
+            .select_related("virtual_content", "virtual_content_item")
+            .only("id", "received_at", "virtual_content__name", "virtual_content_item__content")
         )
         # page
         page = self.paginate_queryset(histories)
@@ -196,12 +325,14 @@ class ReceiveHistoryViewSet(ListMixin, MainViewSet):
         return self.get_paginated_response(slz.data)
 
 
-class VCStatsViewSet(ListMixin, MainViewSet):
+class VCStatsViewSet(ReplicaReadMixin, ListMixin, MainViewSet):
     """
     Virtual Content Stats
     """
 
     queryset = UserReceiveStats.get_queryset()
+    renderer_classes = [ORJSONAPIRenderer]
+    replica_actions = ["list"]
     enable_cache = True
     cache_user_bind = False
     cache_timeout = 60 * 5
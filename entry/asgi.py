@@ -1,13 +1,26 @@
 import os
 
-from channels.routing import ProtocolTypeRouter
+from channels.auth import AuthMiddlewareStack
+from channels.routing import ProtocolTypeRouter, URLRouter
+from channels.security.websocket import OriginValidator
+from django.conf import settings
 from django.core.asgi import get_asgi_application
 from opentelemetry.instrumentation.asgi import OpenTelemetryMiddleware
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "entry.settings")
 
+# apps should be loaded before importing consumers
+django_asgi_app = get_asgi_application()
+
+# pylint: disable=C0413
+from apps.vcd.routing import websocket_urlpatterns  # noqa: E402
+
 application = ProtocolTypeRouter(
     {
-        "http": OpenTelemetryMiddleware(get_asgi_application()),
+        "http": OpenTelemetryMiddleware(django_asgi_app),
+        # browsers connect from the frontend, not from the api host
+        "websocket": OriginValidator(
+            AuthMiddlewareStack(URLRouter(websocket_urlpatterns)), settings.CORS_ORIGIN_WHITELIST
+        ),
     }
 )
@@ -91,31 +91,79 @@ TEMPLATES = [
 # DB and Cache
 DATABASES = {
     "default": {
-        "ENGINE": "dj_db_conn_pool.backends.mysql",
+        "ENGINE": "apps.core.backends.mysql",
         "NAME": getenv_or_raise("DB_NAME"),
         "USER": getenv_or_raise("DB_USER"),
         "PASSWORD": getenv_or_raise("DB_PASSWORD"),
         "HOST": getenv_or_raise("DB_HOST"),
         "PORT": int(getenv_or_raise("DB_PORT")),
-        "CONN_MAX_AGE": int(os.getenv("DB_CONN_MAX_AGE", str(60 * 60))),
+        # connections go back to the pool after each request, the pool keeps them alive
+        "CONN_MAX_AGE": int(os.getenv("DB_CONN_MAX_AGE", "0")),
         "OPTIONS": {"charset": "utf8mb4"},
         "POOL_OPTIONS": {
             "POOL_SIZE": int(os.getenv("DB_POOL_SIZE", "200")),
             "MAX_OVERFLOW": int(os.getenv("DB_POOL_MAX_OVERFLOW", "800")),
+            "TIMEOUT": int(os.getenv("DB_POOL_TIMEOUT", "30")),
+            "RECYCLE": int(os.getenv("DB_POOL_RECYCLE", str(60 * 15))),
         },
     }
 }
+# reads of listings and stats go to the replica when configured
+if os.getenv("DB_REPLICA_HOST"):
+    DATABASES["replica"] = {
+        **DATABASES["default"],
+        "USER": os.getenv("DB_REPLICA_USER") or DATABASES["default"]["USER"],
+        "PASSWORD": os.getenv("DB_REPLICA_PASSWORD") or DATABASES["default"]["PASSWORD"],
+        "HOST": os.getenv("DB_REPLICA_HOST"),
+        "PORT": int(os.getenv("DB_REPLICA_PORT") or DATABASES["default"]["PORT"]),
+        "POOL_OPTIONS": {
+            "POOL_SIZE": int(os.getenv("DB_REPLICA_POOL_SIZE") or DATABASES["default"]["POOL_OPTIONS"]["POOL_SIZE"]),
+            "MAX_OVERFLOW": int(
+                os.getenv("DB_REPLICA_POOL_MAX_OVERFLOW") or DATABASES["default"]["POOL_OPTIONS"]["MAX_OVERFLOW"]
+            ),
+        },
+        "TEST": {"MIRROR": "default"},
+    }
+DATABASE_ROUTERS = ["apps.core.routers.ReplicaRouter"]
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 REDIS_HOST = getenv_or_raise("REDIS_HOST")
 REDIS_PORT = int(getenv_or_raise("REDIS_PORT"))
 REDIS_USER = os.getenv("REDIS_USER", "")
 REDIS_PASSWORD = getenv_or_raise("REDIS_PASSWORD")
 REDIS_DB = int(getenv_or_raise("REDIS_DB"))
+REDIS_URL = f"redis://{REDIS_USER}:{REDIS_PASSWORD}@{REDIS_HOST}:{REDIS_PORT}/{REDIS_DB}"
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", "0"))
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", "5"))
+REDIS_SOCKET_CONNECT_TIMEOUT = float(os.getenv("REDIS_SOCKET_CONNECT_TIMEOUT", "5"))
+# each role can use its own endpoint and pool, such as REDIS_STOCK_URL and REDIS_STOCK_MAX_CONNECTIONS
+REDIS_ROLES = {
+    role: {
+        "url": os.getenv(f"REDIS_{role.upper()}_URL") or REDIS_URL,
+        "max_connections": int(os.getenv(f"REDIS_{role.upper()}_MAX_CONNECTIONS") or REDIS_MAX_CONNECTIONS),
+        "socket_timeout": float(os.getenv(f"REDIS_{role.upper()}_SOCKET_TIMEOUT") or REDIS_SOCKET_TIMEOUT),
+        "socket_connect_timeout": float(
+            os.getenv(f"REDIS_{role.upper()}_SOCKET_CONNECT_TIMEOUT") or REDIS_SOCKET_CONNECT_TIMEOUT
+        ),
+    }
+    for role in ["cache", "stock", "session", "broker", "channel"]
+}
 CACHES = {
-    "default": {
+    alias: {
         "BACKEND": "django_redis.cache.RedisCache",
-        "LOCATION": f"redis://{REDIS_USER}:{REDIS_PASSWORD}@{REDIS_HOST}:{REDIS_PORT}/{REDIS_DB}",
+        "LOCATION": REDIS_ROLES[role]["url"],
+        "OPTIONS": {
+            "CONNECTION_FACTORY": "apps.core.pools.RedisConnectionFactory",
+            "POOL_ROLE": role,
+            "SOCKET_TIMEOUT": REDIS_ROLES[role]["socket_timeout"],
+            "SOCKET_CONNECT_TIMEOUT": REDIS_ROLES[role]["socket_connect_timeout"],
+            "CONNECTION_POOL_KWARGS": (
+                {"max_connections": REDIS_ROLES[role]["max_connections"]}
+                if REDIS_ROLES[role]["max_connections"]
+                else {}
+            ),
+        },
     }
+    for alias, role in [("default", "cache"), ("stock", "stock"), ("session", "session")]
 }
 
 # ASGI
@@ -125,7 +173,16 @@ CHANNEL_LAYERS = {
         "BACKEND": "channels_redis.core.RedisChannelLayer",
         "CONFIG": {
             "hosts": [
-                f"redis://{REDIS_USER}:{REDIS_PASSWORD}@{REDIS_HOST}:{REDIS_PORT}/{REDIS_DB}",
+                {
+                    "address": REDIS_ROLES["channel"]["url"],
+                    "socket_timeout": REDIS_ROLES["channel"]["socket_timeout"],
+                    "socket_connect_timeout": REDIS_ROLES["channel"]["socket_connect_timeout"],
+                    **(
+                        {"max_connections": REDIS_ROLES["channel"]["max_connections"]}
+                        if REDIS_ROLES["channel"]["max_connections"]
+                        else {}
+                    ),
+                },
             ],
         },
     },
@@ -161,12 +218,18 @@ STATIC_URL = "/static/"
 STATIC_ROOT = os.path.join(BASE_DIR, "static")
 STATICFILES_DIRS = [os.path.join(BASE_DIR, "staticfiles")]
 
+# Archive, required to archive histories, should be a persistent volume as archived rows are deleted
+ARCHIVE_ROOT = os.getenv("ARCHIVE_ROOT", "")
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "1000"))
+
 # Session
 SESSION_COOKIE_NAME = os.getenv("SESSION_COOKIE_NAME", f"{'dev-' if DEBUG else ''}{APP_CODE}-sessionid")
-SESSION_ENGINE = "django.contrib.sessions.backends.cache"
-SESSION_CACHE_ALIAS = "default"
+SESSION_ENGINE = os.getenv("SESSION_ENGINE", "django.contrib.sessions.backends.cache")
+SESSION_CACHE_ALIAS = "session"
 SESSION_COOKIE_AGE = int(os.getenv("SESSION_COOKIE_AGE", str(60 * 60 * 24)))
 SESSION_COOKIE_DOMAIN = os.getenv("SESSION_COOKIE_DOMAIN")
+SESSION_LOCAL_CACHE_TIMEOUT = int(os.getenv("SESSION_LOCAL_CACHE_TIMEOUT", "0"))
+SESSION_LOCAL_CACHE_SIZE = int(os.getenv("SESSION_LOCAL_CACHE_SIZE", "10000"))
 
 # Log
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
@@ -174,11 +237,19 @@ LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
 LOGGING = get_logging_config_dict(log_level=LOG_LEVEL, log_format=LOG_FORMAT)
 
 # rest_framework
+API_ORJSON_ENABLED = strtobool(os.getenv("API_ORJSON_ENABLED", "True"))
+IDEMPOTENCY_TIMEOUT = int(os.getenv("IDEMPOTENCY_TIMEOUT", str(60 * 10)))
+IDEMPOTENCY_PROCESSING_TIMEOUT = int(os.getenv("IDEMPOTENCY_PROCESSING_TIMEOUT", "30"))
 REST_FRAMEWORK = {
     "DEFAULT_RENDERER_CLASSES": ["ovinc_client.core.renderers.APIRenderer"],
     "DEFAULT_PAGINATION_CLASS": "ovinc_client.core.paginations.NumPagination",
     "DATETIME_FORMAT": "%Y-%m-%dT%H:%M:%S%z",
-    "DEFAULT_THROTTLE_RATES": {"receive_virtual_content": "1/s"},
+    "DEFAULT_THROTTLE_RATES": {
+        "receive_virtual_content": os.getenv("THROTTLE_RECEIVE_RATE", "1/s"),
+        "receive_virtual_content_ip": os.getenv("THROTTLE_RECEIVE_IP_RATE") or None,
+        "receive_virtual_content_user_content": os.getenv("THROTTLE_RECEIVE_USER_CONTENT_RATE") or None,
+        "tcaptcha_config": os.getenv("THROTTLE_TCAPTCHA_CONFIG_RATE", "2/s"),
+    },
     "EXCEPTION_HANDLER": "ovinc_client.core.exceptions.exception_handler",
     "UNAUTHENTICATED_USER": "ovinc_client.account.models.CustomAnonymousUser",
     "DEFAULT_AUTHENTICATION_CLASSES": ["ovinc_client.core.auth.LoginRequiredAuthenticate"],
@@ -194,7 +265,12 @@ CELERY_TASK_TRACK_STARTED = True
 CELERY_TASK_TIME_LIMIT = 30 * 60
 CELERY_ACCEPT_CONTENT = ["pickle", "json"]
 CELERY_WORKER_HIJACK_ROOT_LOGGER = False
-BROKER_URL = f"redis://{REDIS_USER}:{REDIS_PASSWORD}@{REDIS_HOST}:{REDIS_PORT}/{REDIS_DB}"
+BROKER_URL = REDIS_ROLES["broker"]["url"]
+CELERY_BROKER_POOL_LIMIT = REDIS_ROLES["broker"]["max_connections"] or 10
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    "socket_timeout": REDIS_ROLES["broker"]["socket_timeout"],
+    "socket_connect_timeout": REDIS_ROLES["broker"]["socket_connect_timeout"],
+}
 
 # APM
 ENABLE_TRACE = strtobool(os.getenv("ENABLE_TRACE", "False"))
@@ -225,11 +301,34 @@ CAPTCHA_PASS_THROUGH_SECONDS = int(os.getenv("CAPTCHA_PASS_THROUGH_SECONDS", "0"
 CAPTCHA_BLACKLIST_CHECK_SECONDS = int(os.getenv("CAPTCHA_BLACKLIST_CHECK_SECONDS", str(60 * 60 * 24)))
 CAPTCHA_BLACKLIST_COUNT = int(os.getenv("CAPTCHA_BLACKLIST_COUNT", "3"))
 CAPTCHA_BLACKLIST_CACHE_TIMEOUT = int(os.getenv("CAPTCHA_BLACKLIST_CACHE_TIMEOUT", str(60 * 10)))
+CAPTCHA_HISTORY_RETENTION_DAYS = int(os.getenv("CAPTCHA_HISTORY_RETENTION_DAYS", "0"))
+
+# Virtual Content
+VCD_RESERVATION_TIMEOUT = int(os.getenv("VCD_RESERVATION_TIMEOUT", "60"))
+VCD_LEASE_SIZE = int(os.getenv("VCD_LEASE_SIZE", "0"))
+VCD_LEASE_TIMEOUT = int(os.getenv("VCD_LEASE_TIMEOUT", "5"))
+VCD_LEASE_MIN_STOCK = int(os.getenv("VCD_LEASE_MIN_STOCK", "1000"))
+VCD_HISTORY_RETENTION_DAYS = int(os.getenv("VCD_HISTORY_RETENTION_DAYS", "0"))
+VCD_PREWARM_SECONDS = int(os.getenv("VCD_PREWARM_SECONDS", "60"))
+VCD_ADMISSION_SLACK_RATIO = float(os.getenv("VCD_ADMISSION_SLACK_RATIO", "0.1"))
+VCD_ADMISSION_MIN_SLACK = int(os.getenv("VCD_ADMISSION_MIN_SLACK", "10"))
+VCD_BROADCAST_RATE = int(os.getenv("VCD_BROADCAST_RATE", "2"))
+VCD_EXPORT_BATCH_SIZE = int(os.getenv("VCD_EXPORT_BATCH_SIZE", "2000"))
+VCD_ITEM_COMPRESS_MIN_LENGTH = int(os.getenv("VCD_ITEM_COMPRESS_MIN_LENGTH", "0"))
+VCD_ITEM_ENCRYPT_KEY = os.getenv("VCD_ITEM_ENCRYPT_KEY", "")
+VCD_HEADER_ALLOWLIST = os.getenv(
+    "VCD_HEADER_ALLOWLIST",
+    "User-Agent,Accept,Accept-Language,Accept-Encoding,Origin,Referer,Sec-Ch-Ua,Sec-Ch-Ua-Mobile,Sec-Ch-Ua-Platform",
+).split(",")
 
 # OAuth
 OAUTH_SSL_VERIFY = strtobool(os.getenv("OAUTH_SSL_VERIFY", "True"))
 OAUTH_PROXY_URL = os.getenv("OAUTH_PROXY_URL") or None
 OAUTH_STATE_TIMEOUT = int(os.getenv("OAUTH_STATE_TIMEOUT") or 60 * 10)
+OAUTH_PROFILE_SNAPSHOT_TIMEOUT = int(os.getenv("OAUTH_PROFILE_SNAPSHOT_TIMEOUT") or SESSION_COOKIE_AGE)
+OAUTH_TIMEOUT = int(os.getenv("OAUTH_TIMEOUT", "10"))
+OAUTH_RETRIES = int(os.getenv("OAUTH_RETRIES", "1"))
+OAUTH_POOL_SIZE = int(os.getenv("OAUTH_POOL_SIZE", "10"))
 OAUTH2_CLIENT = {
     "provider": {
         "client_id": getenv_or_raise("OAUTH2_CLIENT_ID"),
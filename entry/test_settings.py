@@ -0,0 +1,44 @@
+# pylint: disable=W0401,W0614,C0413
+import os
+from pathlib import Path
+
+import fakeredis
+from environ import environ
+
+# Env, values of .env and the shell take precedence
+environ.Env.read_env(os.path.join(Path(__file__).resolve().parent.parent, "env.example"))
+
+from entry.settings import *  # noqa: E402,F401,F403 isort:skip
+
+# DB, sqlite keeps tests free of a mysql server, the replica mirrors the primary
+DATABASES = {
+    "default": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": ":memory:",
+    },
+    "replica": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": ":memory:",
+        "TEST": {"MIRROR": "default"},
+    },
+}
+
+# Cache, all roles share one in memory redis
+FAKE_REDIS_SERVER = fakeredis.FakeServer()
+for _alias in CACHES:
+    CACHES[_alias]["LOCATION"] = "redis://localhost:6379/0"
+    CACHES[_alias]["OPTIONS"]["CONNECTION_POOL_KWARGS"] = {
+        "connection_class": fakeredis.FakeRedisConnection,
+        "server": FAKE_REDIS_SERVER,
+    }
+CHANNEL_LAYERS = {"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+
+# Celery, tasks sent by name stay in memory
+BROKER_URL = "memory://"
+CELERY_TASK_ALWAYS_EAGER = True
+
+# Migrations, data migrations load current models, tables are created from models instead
+MIGRATION_MODULES = {"account": None, "oauth": None, "tcaptcha": None, "vcd": None}
+
+# Logging, expected errors of failing requests stay out of the test output
+LOGGING = {"version": 1, "disable_existing_loggers": True}